@@ -0,0 +1,109 @@
+"""
+Measures the cold start of the Lambda handler: importing `main` and serving the first
+requests through Mangum, each run in a fresh interpreter.
+
+Run from the repository root, against a migrated database:
+
+    export DATABASE_URL=sqlite:///./cold_start.db
+    python -m db.migrate && python -m benchmarks.bench_cold_start --runs 5
+
+With `--max-import-ms` the exit status is 1 when the median import time exceeds it,
+so the script can guard cold start time in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# Runs in the child interpreter; prints the timings as JSON on its last line.
+CHILD = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+def event(path):
+    return {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": path,
+        "rawQueryString": "",
+        "headers": {"host": "localhost"},
+        "requestContext": {
+            "http": {"method": "GET", "path": path, "sourceIp": "127.0.0.1",
+                     "protocol": "HTTP/1.1"},
+            "stage": "$default",
+        },
+        "isBase64Encoded": False,
+    }
+
+timings = {"import_ms": (imported - start) * 1000}
+for name, path in (("first_request_ms", "/v1/jobs/all/"),
+                   ("second_request_ms", "/v1/jobs/all/")):
+    started = time.perf_counter()
+    response = main.handler(event(path), None)
+    timings[name] = (time.perf_counter() - started) * 1000
+    assert response["statusCode"] == 200, response
+print(json.dumps(timings))
+"""
+
+
+# Seconds a child interpreter may take, far above any cold start.
+CHILD_TIMEOUT = 120
+
+
+def run_once() -> Dict[str, float]:
+    """
+    Starts a fresh interpreter in Lambda mode and returns its timings, including the
+    wall clock time of the whole process.
+    """
+    env = dict(os.environ, LAMBDA_PRODUCTION="true")
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+        # A child left running by a thread that never exits fails the run.
+        timeout=CHILD_TIMEOUT,
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings["process_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        name: round(statistics.median(run[name] for run in runs), 1) for name in runs[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--json", help="also write the median timings to this file")
+    args = parser.parse_args()
+
+    # The first run compiles the bytecode and warms the file cache; it is not part of
+    # the measurement.
+    run_once()
+    runs = [run_once() for _ in range(args.runs)]
+    medians = summarize(runs)
+    for name, value in medians.items():
+        print(f"{name:<20}{value:>10}")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(medians, output, indent=2)
+    if args.max_import_ms is not None and medians["import_ms"] > args.max_import_ms:
+        print(f"import_ms exceeds {args.max_import_ms}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measures password verification throughput for each candidate hashing cost.
+
+Every login runs one verification, so single-threaded verifications per second is
+the login throughput of one core at that cost. Run from the repository root:
+
+    python -m benchmarks.bench_hashing --rounds 10 11 12 13 --argon2 --max-verify-ms 250
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from core.hashing import build_password_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def measure(context, seconds: float) -> Dict[str, float]:
+    """
+    Verifies one hash repeatedly for at least `seconds` and returns the mean verify
+    time and the resulting logins per second on a single core.
+    """
+    hashed = context.hash(PASSWORD)
+    iterations = 0
+    start = time.perf_counter()
+    while True:
+        context.verify(PASSWORD, hashed)
+        iterations += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and iterations >= 3:
+            break
+    return {
+        "verify_ms": round(elapsed / iterations * 1000, 2),
+        "logins_per_sec_per_core": round(iterations / elapsed, 2),
+    }
+
+
+def run(rounds: List[int], argon2: bool, seconds: float) -> List[Dict]:
+    results = []
+    for cost in rounds:
+        context = build_password_context(["bcrypt"], cost)
+        results.append({"scheme": "bcrypt", "cost": cost, **measure(context, seconds)})
+    if argon2:
+        context = build_password_context(["argon2"], rounds[0])
+        results.append(
+            {"scheme": "argon2id", "cost": None, **measure(context, seconds)}
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument(
+        "--argon2",
+        action="store_true",
+        help="also measure argon2id with the ARGON2_* settings (needs argon2-cffi)",
+    )
+    parser.add_argument("--seconds", type=float, default=2.0, help="time per cost")
+    parser.add_argument(
+        "--max-verify-ms",
+        type=float,
+        help="recommend the highest bcrypt cost whose verify time stays under this",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.argon2, args.seconds)
+    print(f"{'scheme':<10}{'cost':>6}{'verify ms':>12}{'logins/s/core':>16}")
+    for result in results:
+        cost = "-" if result["cost"] is None else result["cost"]
+        print(
+            f"{result['scheme']:<10}{cost:>6}{result['verify_ms']:>12}"
+            f"{result['logins_per_sec_per_core']:>16}"
+        )
+    if args.max_verify_ms is not None:
+        eligible = [
+            result
+            for result in results
+            if result["scheme"] == "bcrypt"
+            and result["verify_ms"] <= args.max_verify_ms
+        ]
+        if eligible:
+            best = max(eligible, key=lambda result: result["cost"])
+            print(f"recommended BCRYPT_ROUNDS={best['cost']}")
+        else:
+            print("no measured bcrypt cost meets --max-verify-ms")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+"""
+Load tests every route against a seeded database served by a local uvicorn.
+
+Seeds `--users` users and `--jobs` jobs into a fresh database, starts the application
+with uvicorn in a subprocess and drives each scenario with `--concurrency` async
+clients. Reports p50/p95/p99 latency, throughput and the peak RSS of the server per
+endpoint. Run from the repository root:
+
+    python -m benchmarks.bench_routes --users 10000 --jobs 100000 --output bench.json
+    python -m benchmarks.bench_routes --reuse --output new.json --baseline bench.json
+
+The JSON written by `--output` has sorted keys and one endpoint per object, so
+the results of two commits can be diffed directly, or compared with `--baseline`.
+The operational `/metrics` routes are not load tested.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Engine
+
+from core.hashing import Hasher
+from db.base import Job, User
+from db.migrate import run as migrate
+
+PASSWORD = "correct horse battery staple"
+SEED_CHUNK_SIZE = 5000
+LOCATIONS = ["Remote", "Berlin", "London", "New York", "Bangalore", "Oslo"]
+KEYWORDS = ["python", "kubernetes", "postgres", "react", "rust", "golang"]
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.example.com"
+
+
+def job_description(n: int) -> str:
+    return f"Build {KEYWORDS[n % len(KEYWORDS)]} services. "
+
+
+def seed(engine: Engine, users: int, jobs: int) -> None:
+    """
+    Inserts `users` users and `jobs` jobs, owned round robin, in chunks.
+
+    The first user is a superuser. Every user shares one password hash, so seeding
+    a million users does not cost a million bcrypt rounds.
+    """
+    hashed_password = Hasher.get_password_hash(PASSWORD)
+    posted = date.today()
+    with engine.begin() as connection:
+        for start in range(0, users, SEED_CHUNK_SIZE):
+            connection.execute(
+                insert(User.__table__),
+                [
+                    {
+                        "id": index + 1,
+                        "username": f"user{index}",
+                        "email": user_email(index),
+                        "hashed_password": hashed_password,
+                        "is_active": True,
+                        "is_superuser": index == 0,
+                    }
+                    for index in range(start, min(start + SEED_CHUNK_SIZE, users))
+                ],
+            )
+        for start in range(0, jobs, SEED_CHUNK_SIZE):
+            connection.execute(
+                insert(Job.__table__),
+                [
+                    {
+                        "job_id": index + 1,
+                        "job_title": f"Software engineer {index}",
+                        "job_company": f"company{index % 500}",
+                        "job_company_url": "https://example.com/careers",
+                        "job_location": LOCATIONS[index % len(LOCATIONS)],
+                        "job_description": job_description(index) * 10,
+                        "job_date_posted": posted - timedelta(days=index % 50),
+                        "job_is_active": True,
+                        "job_owner_id": index % users + 1,
+                    }
+                    for index in range(start, min(start + SEED_CHUNK_SIZE, jobs))
+                ],
+            )
+
+
+def prepare_database(url: str, users: int, jobs: int, reuse: bool) -> Dict[str, int]:
+    """
+    Migrates and seeds the database of `url`, or with `reuse` keeps the existing
+    data. A SQLite database file is recreated from scratch; other databases must be
+    empty. Returns the number of seeded users and the highest seeded job id.
+    """
+    engine = create_engine(url)
+    if not reuse:
+        if engine.dialect.name == "sqlite" and engine.url.database:
+            engine.dispose()
+            if os.path.exists(engine.url.database):
+                os.remove(engine.url.database)
+        migrate("upgrade", "head", engine)
+        started = time.perf_counter()
+        seed(engine, users, jobs)
+        elapsed = time.perf_counter() - started
+        print(f"seeded {users} users and {jobs} jobs in {elapsed:.1f}s")
+    with engine.connect() as connection:
+        counts = {
+            "users": connection.execute(
+                select(func.count()).where(User.username.like("user%"))
+            ).scalar(),
+            "jobs": connection.execute(
+                select(func.max(Job.job_id)).where(Job.job_company.like("company%"))
+            ).scalar()
+            or 0,
+        }
+    engine.dispose()
+    return counts
+
+
+class Server:
+    """
+    The application served by uvicorn in a subprocess, with the RSS of its process.
+    """
+
+    def __init__(self, database_url: str, port: int):
+        self.base_url = f"http://127.0.0.1:{port}"
+        # Every request comes from one IP: the login scenario measures the password
+        # check, not the login rate limiter.
+        env = dict(
+            os.environ,
+            DATABASE_URL=database_url,
+            MIGRATE_ON_STARTUP="false",
+            LOGIN_RATE_LIMIT_BACKEND="none",
+        )
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+                "--no-access-log",
+            ],
+            env=env,
+        )
+
+    def wait_until_ready(self, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving requests")
+            try:
+                if httpx.get(f"{self.base_url}/v1/").status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        raise RuntimeError("uvicorn did not start in time")
+
+    def rss_mb(self) -> Optional[float]:
+        """
+        Returns the resident set size of the server in MiB, or None where /proc is
+        not available.
+        """
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+        return None
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+@dataclass
+class Context:
+    """
+    The state shared by the scenarios: seeded sizes, tokens and the jobs created
+    during the run, which the update and delete scenarios work on.
+    """
+
+    users: int
+    jobs: int
+    user_headers: Dict[str, str]
+    admin_headers: Dict[str, str]
+    created_job_ids: List[int]
+    run_id: str
+
+
+@dataclass
+class Scenario:
+    """
+    One endpoint under load. `build` returns the keyword arguments of
+    `httpx.AsyncClient.request` for the n-th request; `share` scales the number of
+    requests of the run for expensive endpoints.
+    """
+
+    name: str
+    method: str
+    path: str
+    build: Callable[[Context, int], Dict]
+    share: float = 1.0
+
+
+def random_job_id(context: Context, n: int) -> int:
+    return random.randint(1, context.jobs)
+
+
+def job_payload(n: int) -> Dict:
+    return {
+        "job_title": f"Benchmark engineer {n}",
+        "job_company": "bench",
+        "job_location": LOCATIONS[n % len(LOCATIONS)],
+        "job_description": job_description(n),
+    }
+
+
+SCENARIOS = [
+    Scenario("root", "GET", "/v1/", lambda c, n: {}),
+    Scenario(
+        "login",
+        "POST",
+        "/v1/login/token",
+        lambda c, n: {
+            "data": {
+                "username": user_email(random.randrange(c.users)),
+                "password": PASSWORD,
+            }
+        },
+        share=0.25,
+    ),
+    Scenario(
+        "register",
+        "POST",
+        "/v1/users/register/",
+        lambda c, n: {
+            "json": {
+                "username": f"bench-{c.run_id}-{n}",
+                "email": f"bench-{c.run_id}-{n}@bench.example.com",
+                "password": PASSWORD,
+            }
+        },
+        share=0.25,
+    ),
+    Scenario(
+        "create_job",
+        "POST",
+        "/v1/jobs/create/",
+        lambda c, n: {"json": job_payload(n), "headers": c.user_headers},
+    ),
+    Scenario(
+        "bulk_create_jobs",
+        "POST",
+        "/v1/jobs/bulk/",
+        lambda c, n: {
+            "json": [job_payload(n * 100 + i) for i in range(100)],
+            "headers": c.user_headers,
+        },
+        share=0.05,
+    ),
+    Scenario(
+        "read_job",
+        "GET",
+        "/v1/jobs/get/{id}/",
+        lambda c, n: {"path": {"id": random_job_id(c, n)}},
+    ),
+    Scenario("list_jobs", "GET", "/v1/jobs/all/", lambda c, n: {}),
+    Scenario(
+        "list_jobs_by_location",
+        "GET",
+        "/v1/jobs/all/",
+        lambda c, n: {
+            "params": {"location": LOCATIONS[n % len(LOCATIONS)], "view": "summary"}
+        },
+    ),
+    Scenario(
+        "my_jobs", "GET", "/v1/jobs/mine/", lambda c, n: {"headers": c.user_headers}
+    ),
+    Scenario(
+        "search_jobs",
+        "GET",
+        "/v1/jobs/search/",
+        lambda c, n: {"params": {"q": KEYWORDS[n % len(KEYWORDS)]}},
+    ),
+    Scenario("export_jobs", "GET", "/v1/jobs/export/", lambda c, n: {}, share=0.01),
+    Scenario(
+        "update_job",
+        "PUT",
+        "/v1/jobs/update/{id}/",
+        lambda c, n: {
+            "path": {"id": c.created_job_ids[n % len(c.created_job_ids)]},
+            "json": job_payload(n),
+            "headers": c.user_headers,
+        },
+    ),
+    Scenario("list_users", "GET", "/v1/users/", lambda c, n: {}),
+    Scenario(
+        "user_jobs",
+        "GET",
+        "/v1/users/{id}/jobs/",
+        lambda c, n: {
+            "path": {"id": random.randint(1, c.users)},
+            "headers": c.admin_headers,
+        },
+    ),
+    # Runs last: it deletes the jobs created by create_job.
+    Scenario(
+        "delete_job",
+        "DELETE",
+        "/v1/jobs/delete/{id}/",
+        lambda c, n: {
+            "path": {"id": c.created_job_ids.pop()},
+            "headers": c.user_headers,
+        },
+    ),
+]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    server: Server,
+    scenario: Scenario,
+    context: Context,
+    requests: int,
+    concurrency: int,
+) -> Dict:
+    """
+    Sends `requests` requests of `scenario` from `concurrency` concurrent clients
+    and summarizes their latencies, statuses and the peak RSS of the server.
+    """
+    counter = itertools.count()
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    peak_rss = server.rss_mb()
+    done = False
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while not done:
+            rss = server.rss_mb()
+            if rss is not None:
+                peak_rss = max(peak_rss or 0.0, rss)
+            await asyncio.sleep(0.05)
+
+    async def worker():
+        while True:
+            n = next(counter)
+            if n >= requests:
+                return
+            kwargs = scenario.build(context, n)
+            url = scenario.path.format(**kwargs.pop("path", {}))
+            started = time.perf_counter()
+            response = await client.request(scenario.method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = (
+                statuses.get(str(response.status_code), 0) + 1
+            )
+            if scenario.name == "create_job" and response.status_code == 200:
+                context.created_job_ids.append(response.json()["job_id"])
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    done = True
+    await sampler
+
+    latencies.sort()
+    errors = sum(count for code, count in statuses.items() if not code.startswith("2"))
+    return {
+        "method": scenario.method,
+        "path": scenario.path,
+        "requests": len(latencies),
+        "errors": errors,
+        "status": statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rss_peak_mb": None if peak_rss is None else round(peak_rss, 1),
+    }
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post(
+        "/v1/login/token", data={"username": email, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_scenarios(
+    server: Server,
+    counts: Dict[str, int],
+    scenarios: List[Scenario],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, Dict]:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=server.base_url, limits=limits, timeout=60
+    ) as client:
+        context = Context(
+            users=counts["users"],
+            jobs=counts["jobs"],
+            admin_headers=await login(client, user_email(0)),
+            user_headers=await login(client, user_email(min(1, counts["users"] - 1))),
+            created_job_ids=[],
+            run_id=f"{int(time.time())}",
+        )
+        results = {}
+        for scenario in scenarios:
+            if scenario.name in ("update_job", "delete_job"):
+                scenario_requests = len(context.created_job_ids)
+            else:
+                scenario_requests = max(1, int(requests * scenario.share))
+            if not scenario_requests:
+                print(f"{scenario.name:<24}skipped, create_job did not run")
+                continue
+            results[scenario.name] = result = await run_scenario(
+                client, server, scenario, context, scenario_requests, concurrency
+            )
+            print(
+                f"{scenario.name:<24}{result['throughput_rps']:>9} rps"
+                f"{result['p50_ms']:>10} p50{result['p95_ms']:>10} p95"
+                f"{result['p99_ms']:>10} p99{result['errors']:>7} errors"
+            )
+        return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, report: Dict) -> None:
+    """
+    Prints the change of throughput and p95 latency of every endpoint measured in
+    both reports.
+    """
+    print(f"\ncompared with {baseline['meta'].get('commit')}")
+    for name, result in report["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            continue
+        rps = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100
+        p95 = (result["p95_ms"] / before["p95_ms"] - 1) * 100
+        print(f"{name:<24}{rps:>+9.1f}% rps{p95:>+10.1f}% p95")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument(
+        "--reuse", action="store_true", help="keep the data of a previous run"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="requests per scenario"
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--only", nargs="+", choices=[scenario.name for scenario in SCENARIOS]
+    )
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare with the JSON of an earlier run")
+    args = parser.parse_args()
+
+    random.seed(0)
+    counts = prepare_database(args.database_url, args.users, args.jobs, args.reuse)
+    scenarios = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.only or scenario.name in args.only
+    ]
+    server = Server(args.database_url, args.port)
+    try:
+        server.wait_until_ready()
+        results = asyncio.run(
+            run_scenarios(server, counts, scenarios, args.requests, args.concurrency)
+        )
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "database": args.database_url.split(":", 1)[0],
+            "users": counts["users"],
+            "jobs": counts["jobs"],
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+        },
+        "endpoints": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(json.load(baseline), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compares the throughput of rendering job listings through the response model with
+the FAST_JSON_RESPONSES path.
+
+The response model path is what FastAPI does for `response_model=List[ShowJob]`:
+validate every row into `ShowJob`, run `jsonable_encoder` and dump with the stdlib.
+The fast path is `serialize_job` plus `FastJSONResponse`. Run from the repository root:
+
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse
+
+from core.serialization import FastJSONResponse, orjson
+from db.base import Job  # registers every model so the mappers configure
+from schemas.jobs import ShowJob, serialize_job
+
+
+def make_jobs(rows: int) -> List[Job]:
+    """
+    Builds `rows` transient jobs shaped like typical postings.
+    """
+    posted = date(2022, 3, 20)
+    return [
+        Job(
+            job_id=index,
+            job_title=f"Software engineer {index}",
+            job_company="doogle",
+            job_company_url="https://doogle.example.com/careers",
+            job_location="Remote",
+            job_description="Build and run python services. " * 20,
+            job_date_posted=posted - timedelta(days=index % 365),
+            job_is_active=True,
+            job_version=1,
+            job_updated_at=datetime(2022, 3, 20, 12, 0),
+        )
+        for index in range(rows)
+    ]
+
+
+def render_validated(jobs: List[Job]) -> bytes:
+    field = create_response_field(name="Response_read_jobs", type_=List[ShowJob])
+    content = asyncio.run(serialize_response(field=field, response_content=jobs))
+    return JSONResponse(content).body
+
+
+def render_fast(jobs: List[Job]) -> bytes:
+    return FastJSONResponse([serialize_job(job) for job in jobs]).body
+
+
+def measure(render: Callable[[List[Job]], bytes], jobs: List[Job], repeat: int) -> Dict:
+    """
+    Renders `jobs` `repeat` times and returns the best time and the rows per second.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(jobs)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "best_ms": round(best * 1000, 2),
+        "rows_per_sec": round(len(jobs) / best),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.rows)
+    if render_validated(jobs) != render_fast(jobs):
+        raise SystemExit("the fast path does not render the same body")
+    results = {
+        "rows": args.rows,
+        "orjson": orjson is not None,
+        "response_model": measure(render_validated, jobs, args.repeat),
+        "fast": measure(render_fast, jobs, args.repeat),
+    }
+    print(f"{'path':<16}{'best ms':>12}{'rows/s':>12}")
+    for path in ("response_model", "fast"):
+        result = results[path]
+        print(f"{path:<16}{result['best_ms']:>12}{result['rows_per_sec']:>12}")
+    speedup = results["response_model"]["best_ms"] / results["fast"]["best_ms"]
+    print(f"speedup x{speedup:.1f} ({'orjson' if orjson else 'stdlib json'})")
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import abc
+from typing import Callable, Optional, TypeVar
+
+from core.config import settings
+
+BackendT = TypeVar("BackendT", bound="Backend")
+
+
+class Backend(abc.ABC):
+    """
+    Base of the stores behind the caches and rate limiters, holding entries by
+    string key.
+
+    Implementations must be safe to share between concurrent requests. A shared
+    store such as Redis is seen by every worker process; a per-process store only by
+    its own worker.
+    """
+
+    @abc.abstractmethod
+    async def clear(self) -> None:
+        """
+        Removes every entry of the store.
+        """
+
+
+class RedisBackend(Backend):
+    """
+    Base of the backends shared by every worker through Redis (or any server
+    speaking its protocol), keeping their entries under `prefix`. Requires the
+    optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str):
+        try:
+            from redis import asyncio as redis
+        except ImportError as error:
+            raise RuntimeError(
+                f"{type(self).__name__} requires the 'redis' package"
+            ) from error
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=self._prefix + "*"):
+            await self._client.delete(key)
+
+
+def build_backend(
+    name: str,
+    memory: Callable[[], BackendT],
+    redis: Callable[[str], BackendT],
+) -> Optional[BackendT]:
+    """
+    Builds the backend named by a setting: "memory", "redis" (connected to
+    CACHE_REDIS_URL) or "none", which disables the feature using it.
+
+    Args:
+        name (str): The value of the setting.
+        memory (Callable[[], Backend]): Builds the per-process backend.
+        redis (Callable[[str], Backend]): Builds the Redis backend from its URL.
+
+    Returns:
+        Optional[Backend]: The backend, or None for "none".
+    """
+    if name == "none":
+        return None
+    if name == "redis":
+        return redis(settings.CACHE_REDIS_URL)
+    return memory()
@@ -0,0 +1,219 @@
+import abc
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from core.backends import Backend, RedisBackend, build_backend
+
+
+class TTLCache:
+    """
+    A thread-safe, bounded least-recently-used cache whose entries expire after a
+    fixed time to live.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept; the least recently used
+            entry is evicted when a new one would exceed it.
+        ttl (float): The number of seconds an entry stays valid after being set.
+        hits (int): The number of lookups answered from the cache.
+        misses (int): The number of lookups that found no valid entry.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the value cached for `key`, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Caches `value` under `key` for `ttl` seconds (the cache default if None).
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """
+        Removes `key` from the cache if present.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the current size and the hit and miss counters of the cache.
+        """
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class CacheBackend(Backend):
+    """
+    Interface of the stores behind a `ReadThroughCache`, holding bytes by string key.
+
+    Per-process stores do not see the invalidations of other workers, their entries
+    are only bounded in staleness by the TTL.
+    """
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Returns the bytes stored under `key`, or None.
+        """
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        """
+        Stores `value` under `key` for the TTL of the backend.
+        """
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """
+        Removes `key` if present.
+        """
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    A per-process backend storing entries in a bounded `TTLCache`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._cache.set(key, value)
+
+    async def delete(self, key: str) -> None:
+        self._cache.pop(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+
+class RedisCacheBackend(RedisBackend, CacheBackend):
+    """
+    A cache backend shared by every worker through Redis.
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "cache:"):
+        super().__init__(url, prefix)
+        self._ttl = int(ttl)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(self._prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._client.set(self._prefix + key, value, ex=self._ttl)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._prefix + key)
+
+
+def build_cache_backend(
+    backend: str, maxsize: int, ttl: float, prefix: str
+) -> Optional[CacheBackend]:
+    """
+    Builds the cache backend named by a setting, see `core.backends.build_backend`;
+    "none" disables caching.
+    """
+    return build_backend(
+        backend,
+        memory=lambda: MemoryCacheBackend(maxsize=maxsize, ttl=ttl),
+        redis=lambda url: RedisCacheBackend(url, ttl=ttl, prefix=prefix),
+    )
+
+
+class ReadThroughCache:
+    """
+    Counts hits, misses and invalidations in front of a `CacheBackend`.
+
+    With no backend every lookup is a miss and writes are dropped, so callers do not
+    need to special-case a disabled cache.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], prefix: str):
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: Hashable) -> Optional[bytes]:
+        """
+        Returns the bytes cached for `key`, or None on a miss.
+        """
+        value = None
+        if self.backend is not None:
+            value = await self.backend.get(f"{self.prefix}{key}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: Hashable, value: bytes) -> None:
+        if self.backend is not None:
+            await self.backend.set(f"{self.prefix}{key}", value)
+
+    async def invalidate(self, *keys: Hashable) -> None:
+        """
+        Removes `keys` from the backend; call it after the write has committed.
+        """
+        if self.backend is None:
+            return
+        for key in keys:
+            await self.backend.delete(f"{self.prefix}{key}")
+            self.invalidations += 1
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+        self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit, miss and invalidation counters and the hit ratio.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
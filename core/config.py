@@ -7,22 +7,101 @@ env_path = Path(".") / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
+def parse_signing_keys(value: str, default_key: str) -> dict:
+    """
+    Parses "kid:secret,kid:secret" into a dictionary of secrets by key id; without a
+    value the only key is `default_key`, with the id "default".
+    """
+    if not value:
+        return {"default": default_key}
+    return dict(item.strip().split(":", 1) for item in value.split(",") if item.strip())
+
+
 class Settings:
     PROJECT_VERSION: str = "1.0.0"
     PROJECT_NAME: str = "Job Board API"
+    LAMBDA_PRODUCTION = os.getenv("LAMBDA_PRODUCTION", "false").lower() == "true"
     POSTGRES_USER: str = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "tdd")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", 5432)
     POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER", "localhost")
-    DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    DATABASE_URL: str = os.getenv("DATABASE_URL") or (
+        f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+        if POSTGRES_USER
+        else "sqlite:///./sql_app.db"
+    )
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true"
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
 
     ALGORITHM = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES = 60
-    REFRESH_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7
-    SECRET_KEY: str = (
-        "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"  # "test"  # os.getenv("SECRET_KEY")
+    # Access tokens are short-lived and renewed with the refresh token at
+    # POST /login/refresh; logout revokes both.
+    ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+    REFRESH_TOKEN_EXPIRE_MINUTES = int(
+        os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 60 * 24 * 7)
+    )
+    REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", 5))
+    # Revocation ids re-read by every sync, to catch inserts committed out of order.
+    REVOCATION_SYNC_OVERLAP = int(os.getenv("REVOCATION_SYNC_OVERLAP", 1000))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_ERROR_RATE = 0.001
+    SECRET_KEY: str = os.getenv(
+        "SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
     )
+    # Tokens are signed with the key JWT_ACTIVE_KEY_ID and name it in their `kid`
+    # header. To rotate, add the new key, make it active, and drop the old one once
+    # the tokens it signed have expired.
+    JWT_SIGNING_KEYS = parse_signing_keys(os.getenv("JWT_SIGNING_KEYS"), SECRET_KEY)
+    JWT_ACTIVE_KEY_ID = os.getenv("JWT_ACTIVE_KEY_ID", next(iter(JWT_SIGNING_KEYS)))
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", 300))
+
+    JOBS_PAGE_SIZE = 50
+    JOBS_MAX_PAGE_SIZE = 500
+    EXPORT_BATCH_SIZE = 1000
+    SEARCH_MAX_OFFSET = 1000
+    BULK_CHUNK_SIZE = 500
+    BULK_MAX_ITEMS = 50000
+    JOB_EXPIRY_DAYS = int(os.getenv("JOB_EXPIRY_DAYS", 60))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+    USERS_PAGE_SIZE = 100
+    USERS_MAX_PAGE_SIZE = 1000
+    FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+    SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "true").lower() == "true"
+
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+    USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+    USER_MISS_CACHE_SIZE = int(os.getenv("USER_MISS_CACHE_SIZE", 10000))
+    USER_MISS_CACHE_TTL = float(os.getenv("USER_MISS_CACHE_TTL", 10))
+    JOB_CACHE_BACKEND = os.getenv("JOB_CACHE_BACKEND", "memory")
+    JOB_CACHE_SIZE = int(os.getenv("JOB_CACHE_SIZE", 5000))
+    JOB_CACHE_TTL = float(os.getenv("JOB_CACHE_TTL", 300))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Token buckets checked before the password of a login is verified: a burst
+    # size and a refill rate per minute, by client IP and by username.
+    LOGIN_RATE_LIMIT_BACKEND = os.getenv("LOGIN_RATE_LIMIT_BACKEND", "memory")
+    LOGIN_RATE_LIMIT_STORE_SIZE = int(os.getenv("LOGIN_RATE_LIMIT_STORE_SIZE", 100000))
+    LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", 20))
+    LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", 20))
+    LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", 5))
+    LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", 2))
+
+    HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1))
+    HASHING_MAX_QUEUE = int(os.getenv("HASHING_MAX_QUEUE", 64))
+    HASHING_RETRY_AFTER = 1
+    PASSWORD_SCHEMES = os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",")
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+    ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 19456))
+    ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
 
     TEST_USER_EMAIL = "1usertesting@email.com"
 
@@ -1,9 +1,90 @@
-from passlib.context import CryptContext
+import asyncio
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from core.config import settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+
+def build_password_context(schemes: List[str], bcrypt_rounds: int) -> "CryptContext":
+    """
+    Builds the passlib context used to hash and verify passwords.
+
+    The first scheme hashes new passwords; the others are only accepted for
+    verification and flagged for rehashing. Hashes whose bcrypt cost or argon2
+    parameters differ from the configured ones are flagged as well, so changing
+    the settings upgrades (or downgrades) existing users on their next login.
+
+    Args:
+        schemes (List[str]): The passlib scheme names, e.g. ["argon2", "bcrypt"].
+            argon2 requires the optional `argon2-cffi` package.
+        bcrypt_rounds (int): The bcrypt cost factor (log2 of the iteration count).
+
+    Returns:
+        CryptContext: The configured context.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__time_cost=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+@lru_cache(maxsize=None)
+def password_context() -> "CryptContext":
+    """
+    Returns the context configured by the settings, built on first use so that
+    importing the application does not import passlib and its handlers.
+    """
+    return build_password_context(settings.PASSWORD_SCHEMES, settings.BCRYPT_ROUNDS)
+
+
+@lru_cache(maxsize=None)
+def dummy_password_hash() -> str:
+    """
+    Returns a hash of a random password made with the current settings. Verifying a
+    login for a missing user against it costs as much as for an existing user, so
+    response times do not reveal which accounts exist.
+    """
+    return password_context().hash(secrets.token_hex(16))
+
+
+class HasherBusy(Exception):
+    """
+    Raised when the hashing pool already has as many jobs running and queued as it accepts.
+
+    Attributes:
+        retry_after (int): The number of seconds clients should wait before retrying.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
 
 
 class Hasher:
+    # bcrypt releases the GIL, so a thread pool runs hashes in parallel without
+    # tying up the event loop or the threadpool shared by every other sync route.
+    _executor = ThreadPoolExecutor(
+        max_workers=settings.HASHING_WORKERS, thread_name_prefix="hasher"
+    )
+    _slots = threading.BoundedSemaphore(
+        settings.HASHING_WORKERS + settings.HASHING_MAX_QUEUE
+    )
+
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """
@@ -16,7 +97,7 @@ class Hasher:
         Returns:
             bool: True if the plain password matches the hashed password, False otherwise.
         """
-        return password_context.verify(plain_password, hashed_password)
+        return password_context().verify(plain_password, hashed_password)
 
     @staticmethod
     def get_password_hash(password: str) -> str:
@@ -29,4 +110,90 @@ class Hasher:
         Returns:
             str: The hashed password.
         """
-        return password_context.hash(password)
+        return password_context().hash(password)
+
+    @staticmethod
+    def verify_and_update(
+        plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and rehash it if its hash uses outdated settings.
+
+        Args:
+            plain_password (str): The plain password to be verified.
+            hashed_password (str): The hashed password to be compared against.
+
+        Returns:
+            Tuple[bool, Optional[str]]: Whether the password matches, and the new hash to
+            store if the stored one should be replaced, otherwise None.
+        """
+        return password_context().verify_and_update(plain_password, hashed_password)
+
+    @classmethod
+    async def _run(cls, func, *args):
+        """
+        Runs `func(*args)` on the hashing pool, refusing work instead of queueing
+        without bound when the pool is saturated.
+
+        The slot of a job is released when the job is done, not when the caller
+        stops waiting: a cancelled request does not stop a hash already running.
+
+        Raises:
+            HasherBusy: If `HASHING_WORKERS + HASHING_MAX_QUEUE` jobs are already pending.
+        """
+        if not cls._slots.acquire(blocking=False):
+            raise HasherBusy(retry_after=settings.HASHING_RETRY_AFTER)
+        try:
+            future = cls._executor.submit(func, *args)
+        except BaseException:
+            cls._slots.release()
+            raise
+        future.add_done_callback(lambda _: cls._slots.release())
+        return await asyncio.wrap_future(future)
+
+    @classmethod
+    async def dummy_password_hash_async(cls) -> str:
+        """
+        Like `dummy_password_hash`, but the hash is made on the bounded hashing pool
+        the first time.
+
+        Raises:
+            HasherBusy: If the hashing pool is saturated.
+        """
+        if not dummy_password_hash.cache_info().currsize:
+            return await cls._run(dummy_password_hash)
+        return dummy_password_hash()
+
+    @classmethod
+    async def verify_password_async(
+        cls, plain_password: str, hashed_password: str
+    ) -> bool:
+        """
+        Like `verify_password`, but runs on the bounded hashing pool.
+
+        Raises:
+            HasherBusy: If the hashing pool is saturated.
+        """
+        return await cls._run(cls.verify_password, plain_password, hashed_password)
+
+    @classmethod
+    async def verify_and_update_async(
+        cls, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Like `verify_and_update`, but runs on the bounded hashing pool.
+
+        Raises:
+            HasherBusy: If the hashing pool is saturated.
+        """
+        return await cls._run(cls.verify_and_update, plain_password, hashed_password)
+
+    @classmethod
+    async def get_password_hash_async(cls, password: str) -> str:
+        """
+        Like `get_password_hash`, but runs on the bounded hashing pool.
+
+        Raises:
+            HasherBusy: If the hashing pool is saturated.
+        """
+        return await cls._run(cls.get_password_hash, password)
@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """
+    The database work done on behalf of the current request.
+
+    Attributes:
+        queries (int): The number of statements executed.
+        db_seconds (float): The time spent executing them.
+    """
+
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Set by `TimingMiddleware` for the duration of a request. SQLAlchemy runs the
+# statements of asyncio sessions in greenlets sharing the context of the awaiting
+# task, and Starlette copies the context into the threads of sync handlers, so the
+# engine event hooks see the stats of the request they work for.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def record_query(seconds: float) -> None:
+    """
+    Adds one executed statement taking `seconds` to the current request, if any.
+    """
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+class Histogram:
+    """
+    A thread-safe Prometheus histogram with one series per label value tuple.
+
+    Attributes:
+        name (str): The metric name.
+        documentation (str): The HELP text of the metric.
+        labelnames (Sequence[str]): The names of the labels of every series.
+        buckets (Sequence[float]): The upper bounds of the buckets, in ascending order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        """
+        Records `value` in the series of `labels`.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per bucket counts (the last one is +Inf), then the sum.
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self) -> None:
+        """
+        Removes every series.
+        """
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterable[str]:
+        """
+        Yields the lines of the Prometheus text exposition format of the histogram.
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in self._series.items()
+            ]
+        bounds = [_format_bound(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts, total in sorted(series):
+            label_text = ",".join(
+                f'{name}="{_escape(value)}"'
+                for name, value in zip(self.labelnames, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{{{label_text}}} {total}"
+            yield f"{self.name}_count{{{label_text}}} {cumulative}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else str(bound)
+
+
+def render_gauges(name: str, documentation: str, values: Dict[str, float]) -> List[str]:
+    """
+    Renders one gauge per key of `values`, distinguished by a `name` label.
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for key, value in sorted(values.items()):
+        lines.append(f'{name}{{name="{_escape(key)}"}} {value}')
+    return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle HTTP requests, by method, route and status.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "Number of database statements executed per HTTP request, by method and route.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing database statements per HTTP request, by method and route.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+HISTOGRAMS = (request_duration, request_queries, request_db_duration)
+
+
+def _server_timing(start: float, stats: RequestStats) -> bytes:
+    elapsed = (time.perf_counter() - start) * 1000
+    db_elapsed = stats.db_seconds * 1000
+    return (
+        f'app;dur={elapsed:.1f}, db;dur={db_elapsed:.1f};desc="{stats.queries} queries"'
+    ).encode("latin-1")
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware timing every HTTP request and counting the database statements
+    it executes.
+
+    It records the request histograms of this module by route template (not by
+    path, to keep the number of series bounded) and, with `server_timing`, reports
+    the handler and database time of the request in a `Server-Timing` header.
+
+    It is a plain ASGI middleware rather than a `BaseHTTPMiddleware`, which would
+    run the endpoint in a separate task and buffer streaming responses.
+    """
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", _server_timing(start, stats))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            route_name = getattr(route, "path_format", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe(
+                (method, route_name, str(status_code)), time.perf_counter() - start
+            )
+            request_queries.observe((method, route_name), stats.queries)
+            request_db_duration.observe((method, route_name), stats.db_seconds)
@@ -0,0 +1,40 @@
+import base64
+import json
+from typing import Any, List
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the keyset values of the last row of a page into an opaque cursor.
+
+    Args:
+        *values: JSON serializable values (dates must already be converted to strings).
+
+    Returns:
+        str: A URL-safe token that can be passed back as the `cursor` query parameter.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The opaque cursor token.
+
+    Returns:
+        List[Any]: The keyset values stored in the cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as error:
+        raise ValueError("Invalid cursor") from error
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
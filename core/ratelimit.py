@@ -0,0 +1,178 @@
+import abc
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.backends import Backend, RedisBackend, build_backend
+
+
+class RateLimitBackend(Backend):
+    """
+    Interface of the stores holding token buckets by string key.
+
+    Per-process stores enforce each limit per worker rather than once for all.
+    """
+
+    @abc.abstractmethod
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        """
+        Takes a token from the bucket of `key`, holding at most `capacity` tokens and
+        refilled with `rate` tokens per second. Returns 0 if a token was taken, else
+        the number of seconds until one is available.
+        """
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    A per-process backend keeping the buckets of the `maxsize` most recently seen
+    keys. A forgotten key starts again with a full bucket.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refills and takes from a bucket stored as a hash, atomically on the server.
+REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RedisBackend, RateLimitBackend):
+    """
+    A rate limit backend shared by every worker through Redis, so each limit is
+    enforced once for all of them.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        super().__init__(url, prefix)
+        self._take = self._client.register_script(REDIS_TAKE_SCRIPT)
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        wait = await self._take(
+            keys=[self._prefix + key], args=[capacity, rate, time.time()]
+        )
+        return float(wait)
+
+
+def build_rate_limit_backend(
+    backend: str, maxsize: int, prefix: str
+) -> Optional[RateLimitBackend]:
+    """
+    Builds the rate limit backend named by a setting, see
+    `core.backends.build_backend`; "none" disables rate limiting.
+    """
+    return build_backend(
+        backend,
+        memory=lambda: MemoryRateLimitBackend(maxsize=maxsize),
+        redis=lambda url: RedisRateLimitBackend(url, prefix=prefix),
+    )
+
+
+class RateLimited(Exception):
+    """
+    Raised when a rate limit is exceeded.
+
+    Attributes:
+        retry_after (int): The number of seconds after which to retry.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket limits on several dimensions of a request, e.g. the client IP and
+    the username of a login, counting the requests it allowed and refused.
+
+    Attributes:
+        limits (Dict[str, Tuple[float, float]]): The burst size and the number of
+            requests per minute allowed for each dimension.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[RateLimitBackend],
+        limits: Dict[str, Tuple[float, float]],
+    ):
+        self.backend = backend
+        self.limits = limits
+        self.allowed = 0
+        self.limited: Dict[str, int] = {dimension: 0 for dimension in limits}
+
+    async def check(self, **keys: str) -> None:
+        """
+        Takes a token from the bucket of each dimension given, in the order of
+        `limits`, stopping at the first empty one.
+
+        Raises:
+            RateLimited: If a bucket is empty.
+        """
+        if self.backend is not None:
+            for dimension, (burst, per_minute) in self.limits.items():
+                key = keys.get(dimension)
+                if key is None:
+                    continue
+                wait = await self.backend.take(
+                    f"{dimension}:{key}", capacity=burst, rate=per_minute / 60
+                )
+                if wait > 0:
+                    self.limited[dimension] += 1
+                    raise RateLimited(retry_after=int(wait) + 1)
+        self.allowed += 1
+
+    async def clear(self) -> None:
+        if self.backend is not None:
+            await self.backend.clear()
+        self.allowed = 0
+        self.limited = {dimension: 0 for dimension in self.limits}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of allowed requests and of requests refused by each
+        dimension.
+        """
+        return {
+            "allowed": self.allowed,
+            **{f"limited_by_{name}": count for name, count in self.limited.items()},
+        }
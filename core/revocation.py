@@ -0,0 +1,128 @@
+import hashlib
+import math
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.operations.tokens import is_token_revoked_async, list_revocations_async
+
+
+class BloomFilter:
+    """
+    A fixed-size set of strings answering membership with no false negatives and a
+    bounded rate of false positives.
+
+    Attributes:
+        capacity (int): The number of keys the filter is sized for.
+        error_rate (float): The false positive rate once `capacity` keys are added.
+        count (int): The number of keys added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # Double hashing: the k positions are derived from the two halves of a single
+        # digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+class RevocationIndex:
+    """
+    The revoked token ids of the `revoked_token` table, held in a `BloomFilter` so
+    that checking a token costs no query.
+
+    The filter loads the revocations recorded since its last sync at most every
+    `sync_interval` seconds, so revocations made by other workers are enforced
+    within that delay; those made by this worker immediately. The rare tokens the
+    filter reports as revoked are confirmed in the database. Once more revocations
+    than `capacity` were loaded, the filter is rebuilt from the unexpired ones.
+
+    Ids are assigned when a revocation is inserted, not when it commits, so a
+    revocation can become visible after one with a higher id was loaded. Every sync
+    therefore re-reads the last `sync_overlap` ids before the highest one loaded.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        sync_interval: float,
+        sync_overlap: int,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.sync_overlap = sync_overlap
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Empties the filter; the next check reloads every unexpired revocation.
+        """
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self.last_id = 0
+        self.synced_at: Optional[float] = None
+
+    def add(self, jti: str) -> None:
+        """
+        Adds a token revoked by this worker.
+        """
+        self.bloom.add(jti)
+
+    async def sync_async(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        Loads the revocations recorded since the last sync, if it is due.
+        """
+        now = time.monotonic()
+        if (
+            not force
+            and self.synced_at is not None
+            and now - self.synced_at < self.sync_interval
+        ):
+            return
+        # Set before querying so concurrent requests do not sync at the same time.
+        self.synced_at = now
+        if self.bloom.count > self.capacity:
+            self.bloom = BloomFilter(self.capacity, self.error_rate)
+            self.last_id = 0
+        revocations = await list_revocations_async(
+            db, after=max(0, self.last_id - self.sync_overlap), now=datetime.utcnow()
+        )
+        for revocation_id, jti in revocations:
+            # Revocations of the overlap are mostly loaded already; do not count
+            # them again towards the capacity.
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+            self.last_id = max(self.last_id, revocation_id)
+
+    async def is_revoked_async(self, jti: str, db: AsyncSession) -> bool:
+        """
+        Returns whether the token `jti` was revoked, querying the database only when
+        the filter reports it.
+        """
+        await self.sync_async(db)
+        if jti not in self.bloom:
+            return False
+        return await is_token_revoked_async(jti, db)
@@ -1,54 +1,163 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, NamedTuple, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from core.cache import TTLCache
 from core.config import settings
 from core.hashing import Hasher
+from core.ratelimit import RateLimiter, build_rate_limit_backend
+from core.revocation import RevocationIndex
 from db.models.users import User
-from db.operations.login import get_user
-from db.session import get_db
+from db.operations.tokens import revoke_token_async
+from db.operations.users import get_user_by_email_async
+from db.session import get_async_db
 from routing.utils import OAuth2PasswordBearerWithCookie
 
-SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 60 * 24 * 30
+oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/token")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+reuseable_oauth = OAuth2PasswordBearer(tokenUrl="/login", scheme_name="JWT")
 
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 60 * 24 * 30
+# The `typ` claim of refresh tokens, which are only accepted by POST /login/refresh.
+REFRESH_TOKEN_TYPE = "refresh"
 
 
-oauth2_scheme = OAuth2PasswordBearerWithCookie(tokenUrl="/token")
+class UserSnapshot(NamedTuple):
+    """
+    The fields of an authenticated user needed for authorization decisions.
 
+    Attributes:
+        id (int): The unique id of the User.
+        email (str): The email of the User, also the subject of its tokens.
+        is_active (bool): Whether the User is active.
+        is_superuser (bool): Whether the User is a superuser.
+    """
+
+    id: int
+    email: str
+    is_active: bool
+    is_superuser: bool
+
+
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# The claims of verified tokens by token digest, so repeated requests with a token
+# skip the signature check. Entries never outlive the token they were made from.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+# Checked by the login route before the password is verified, so that refused
+# attempts cost no user lookup and no bcrypt verification.
+login_limiter = RateLimiter(
+    build_rate_limit_backend(
+        settings.LOGIN_RATE_LIMIT_BACKEND,
+        maxsize=settings.LOGIN_RATE_LIMIT_STORE_SIZE,
+        prefix="login:",
+    ),
+    limits={
+        "ip": (settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE),
+        "username": (
+            settings.LOGIN_USERNAME_BURST,
+            settings.LOGIN_USERNAME_PER_MINUTE,
+        ),
+    },
+)
+
+revocation_index = RevocationIndex(
+    capacity=settings.REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+    sync_interval=settings.REVOCATION_SYNC_INTERVAL,
+    sync_overlap=settings.REVOCATION_SYNC_OVERLAP,
+)
+
+# When users modified in this process last changed, by email. Tokens issued before
+# the change no longer vouch for the user claims they carry.
+_user_changes = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+
+def invalidate_cached_user(email: str) -> None:
+    """
+    Drops the cached snapshot of the user with the given email, and stops trusting
+    the user claims of the tokens issued to it so far, so the next authenticated
+    request reads it from the database again.
+
+    Parameters:
+        email (str): The email of the modified user.
+    """
+    user_cache.pop(email)
+    _user_changes.set(email, time.time())
+
+
+# The emails of the users flushed as modified by a session, invalidated once its
+# transaction commits: invalidating at flush would let a concurrent request cache
+# the old row again before the change is visible.
+_MODIFIED_USERS_KEY = "modified_user_emails"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _record_modified_user(mapper, connection, target: User):
+    state = inspect(target)
+    emails = state.session.info.setdefault(_MODIFIED_USERS_KEY, set())
+    emails.add(target.email)
+    emails.update(state.attrs.email.history.deleted)
 
-reuseable_oauth = OAuth2PasswordBearer(tokenUrl="/login", scheme_name="JWT")
 
+@event.listens_for(Session, "after_commit")
+def _invalidate_modified_users(session: Session):
+    for email in session.info.pop(_MODIFIED_USERS_KEY, ()):
+        invalidate_cached_user(email)
 
-def authenticate_user(username: str, password: str, db: Session):
+
+@event.listens_for(Session, "after_rollback")
+def _forget_modified_users(session: Session):
+    session.info.pop(_MODIFIED_USERS_KEY, None)
+
+
+async def authenticate_user_async(username: str, password: str, db: AsyncSession):
     """
     Authenticates a user with the given username and password using the provided database session.
 
     Args:
         username (str): The username of the user to authenticate.
         password (str): The password of the user to authenticate.
-        db (Session): The database session to use for authentication.
+        db (AsyncSession): The database session to use for authentication.
 
     Returns:
         Union[bool, User]: Returns the authenticated user if successful, otherwise False.
+
+    The password is verified on the bounded hashing pool so the event loop stays free
+    during the bcrypt check. If the stored hash was made with outdated hashing
+    settings it is replaced by a hash made with the current ones. For an unknown
+    username the password is verified against the dummy password hash, so the
+    attempt takes as long as one with a wrong password.
+
+    Raises:
+        HasherBusy: If the hashing pool is saturated.
     """
-    user = get_user(username=username, db=db)
+    user = await get_user_by_email_async(email=username, db=db, cache_miss=True)
     if not user:
+        await Hasher.verify_password_async(
+            password, await Hasher.dummy_password_hash_async()
+        )
         return False
-    if not Hasher.verify_password(password, user.hashed_password):
+    verified, new_hash = await Hasher.verify_and_update_async(
+        password, user.hashed_password
+    )
+    if not verified:
         return False
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
@@ -67,13 +176,40 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
     """
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+        expire = now + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": now, "jti": uuid.uuid4().hex})
+    return _encode_token(to_encode)
+
+
+def access_token_claims(user: User) -> Dict[str, Any]:
+    """
+    Returns the claims of an access token for `user`: its email as subject, and the
+    fields of its `UserSnapshot`, so requests carrying the token need no user lookup.
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "su": user.is_superuser,
+        "act": user.is_active,
+    }
+
+
+def _encode_token(claims: Dict[str, Any]) -> str:
+    # jose pulls in the cryptography backends; importing it on first use keeps it off
+    # the cold start of requests that never touch a token.
+    from jose import jwt
+
+    key_id = settings.JWT_ACTIVE_KEY_ID
+    return jwt.encode(
+        claims,
+        settings.JWT_SIGNING_KEYS[key_id],
+        algorithm=settings.ALGORITHM,
+        headers={"kid": key_id},
+    )
 
 
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -92,66 +228,159 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
 
     """
     to_encode = data.copy()
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expires_delta = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expires_delta = datetime.utcnow() + timedelta(
-            minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
-        )
+        expire = now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    to_encode.update(
+        {"exp": expire, "iat": now, "jti": uuid.uuid4().hex, "typ": REFRESH_TOKEN_TYPE}
+    )
+    return _encode_token(to_encode)
 
-    to_encode.update({"exp": expires_delta})
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
+
+async def revoke_token_claims_async(claims: Dict[str, Any], db: AsyncSession) -> bool:
+    """
+    Revokes the token with the given verified claims until it expires, in this
+    worker at once and in the others at their next revocation index sync.
+
+    Returns:
+        bool: True if the token was revoked by this call; False if it was already
+        revoked, or has no `jti` and cannot be revoked.
+    """
+    if "jti" not in claims:
+        return False
+    expires_at = datetime.utcfromtimestamp(claims["exp"])
+    revoked = await revoke_token_async(jti=claims["jti"], expires_at=expires_at, db=db)
+    revocation_index.add(claims["jti"])
+    return revoked
+
+
+async def is_token_revoked_async(claims: Dict[str, Any], db: AsyncSession) -> bool:
+    """
+    Returns whether the token with the given verified claims was revoked. Tokens
+    issued before revocation support have no `jti` and cannot be revoked.
+    """
+    jti = claims.get("jti")
+    return jti is not None and await revocation_index.is_revoked_async(jti, db)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the claims of `token` if its signature and expiry are valid, else None.
+
+    The signing key is picked by the `kid` header; tokens without one were signed
+    before key rotation and are checked with SECRET_KEY. Verified claims are cached
+    by token digest until the token expires, at most TOKEN_CACHE_TTL seconds.
+    """
+    digest = _token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is not None:
+        return claims
+    from jose import JWTError, jwt
+
+    try:
+        key_id = jwt.get_unverified_header(token).get("kid")
+        key = settings.JWT_SIGNING_KEYS.get(key_id) if key_id else settings.SECRET_KEY
+        if key is None:
+            return None
+        claims = jwt.decode(token, key, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if "exp" not in claims:
+        return None
+    ttl = min(settings.TOKEN_CACHE_TTL, claims["exp"] - time.time())
+    token_cache.set(digest, claims, ttl=ttl)
+    return claims
+
+
+def _snapshot_from_claims(claims: Dict[str, Any]) -> Optional[UserSnapshot]:
+    """
+    Returns the user described by the claims of an access token, or None if the
+    token predates the user claims or a change of the user made in this process.
+    """
+    if "uid" not in claims or "iat" not in claims:
+        return None
+    changed_at = _user_changes.get(claims["sub"])
+    if changed_at is not None and claims["iat"] <= changed_at:
+        return None
+    return UserSnapshot(
+        id=claims["uid"],
+        email=claims["sub"],
+        is_active=claims.get("act", True),
+        is_superuser=claims.get("su", False),
     )
-    return encoded_jwt
 
 
-def get_current_user_from_token(
-    token: str = Depends(reuseable_oauth), db: Session = Depends(get_db)
-) -> User:
+async def get_current_user_from_token(
+    token: str = Depends(reuseable_oauth), db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
     """
     Get the current user from the provided token.
 
+    Refresh tokens and revoked tokens are refused; revocations are checked against
+    the in-memory `revocation_index`. Tokens issued by the login route carry the
+    user id and flags, so the user is taken from the verified claims without a
+    query. Older tokens, and tokens issued before a change of the user, fall back to
+    `user_cache` by token subject, so only the first such request of a user within
+    `USER_CACHE_TTL` seconds queries the database.
+
     Parameters:
     - token: str = Depends(reuseable_oauth)
-    - db: Session = Depends(get_db)
+    - db: AsyncSession = Depends(get_async_db)
 
     Returns:
-    - The user retrieved from the token or the invalid_credentials_exception.
+    - A snapshot of the user retrieved from the token or the invalid_credentials_exception.
     """
     invalid_credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-    except JWTError:
+    payload = verify_token(token)
+    if payload is None or payload.get("typ") == REFRESH_TOKEN_TYPE:
         raise invalid_credentials_exception
     username: str = payload.get("sub")
-    if username is None:
+    if username is None or await is_token_revoked_async(payload, db):
         raise invalid_credentials_exception
-    user = get_user(username=username, db=db)
+    snapshot = _snapshot_from_claims(payload)
+    if snapshot is not None:
+        return snapshot
+    snapshot = user_cache.get(username)
+    if snapshot is not None:
+        return snapshot
+    user = await get_user_by_email_async(email=username, db=db)
     if user is None:
         raise invalid_credentials_exception
-    return user
+    snapshot = UserSnapshot(
+        id=user.id,
+        email=user.email,
+        is_active=user.is_active,
+        is_superuser=user.is_superuser,
+    )
+    user_cache.set(username, snapshot)
+    return snapshot
 
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user_from_token),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
 ):
     """
     Retrieves the current active user from the token.
 
     Parameters:
-        current_user (User, optional): The current user obtained from the token. Defaults to the result of the `get_current_user_from_token` dependency.
+        current_user (UserSnapshot, optional): The current user obtained from the token. Defaults to the result of the `get_current_user_from_token` dependency.
 
     Raises:
         HTTPException: If the current user is disabled.
 
     Returns:
-        User
+        UserSnapshot
     """
-    if current_user.disabled:
+    if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -0,0 +1,103 @@
+"""
+Expires old job postings and moves them to the `job_archive` table.
+
+Meant to run from cron or a scheduled task, e.g. daily:
+
+    python -m db.archive --days 60 --batch-size 1000
+
+Archived jobs disappear from listings and search but are still served by
+GET /jobs/get/{id}/. The revocations of tokens that have expired since are purged
+as well.
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import List
+
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.base import Job, JobArchive
+from db.operations.tokens import purge_revocations
+from db.session import SessionLocal
+
+# The columns copied from `job`; the archive adds `job_archived_at`.
+ARCHIVED_COLUMNS = [column.name for column in Job.__table__.columns]
+
+
+def _expired_job_ids(db: Session, posted_before: date, batch_size: int) -> List[int]:
+    # Answered from the partial index on active jobs, whatever the size of the table.
+    statement = (
+        select(Job.job_id)
+        .where(Job.job_is_active, Job.job_date_posted < posted_before)
+        .order_by(Job.job_date_posted, Job.job_id)
+        .limit(batch_size)
+    )
+    return db.execute(statement).scalars().all()
+
+
+def _copy_to_archive_statement(job_ids: List[int], archived_at: datetime):
+    copied = [
+        literal(False).label(name) if name == "job_is_active" else Job.__table__.c[name]
+        for name in ARCHIVED_COLUMNS
+    ]
+    rows = select(*copied, literal(archived_at).label("job_archived_at")).where(
+        Job.job_id.in_(job_ids)
+    )
+    return insert(JobArchive).from_select(ARCHIVED_COLUMNS + ["job_archived_at"], rows)
+
+
+def archive_jobs(db: Session, posted_before: date, batch_size: int) -> int:
+    """
+    Deactivates the active jobs posted before a date and moves them to the archive.
+
+    Jobs are moved in batches of `batch_size`, one transaction each: the batch is
+    copied to `job_archive` as inactive and deleted from `job`, so a job is never
+    listed once deactivated nor missing in between, and an interrupted run resumes
+    where it stopped.
+
+    Args:
+        db (Session): The database session.
+        posted_before (date): Jobs posted strictly before this date are archived.
+        batch_size (int): The number of jobs moved per transaction.
+
+    Returns:
+        int: The number of jobs archived.
+    """
+    archived = 0
+    archived_at = datetime.utcnow()
+    while True:
+        job_ids = _expired_job_ids(db, posted_before, batch_size)
+        if not job_ids:
+            return archived
+        db.execute(_copy_to_archive_statement(job_ids, archived_at))
+        db.execute(
+            delete(Job)
+            .where(Job.job_id.in_(job_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        archived += len(job_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=settings.JOB_EXPIRY_DAYS,
+        help="archive jobs posted more than this many days ago",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    posted_before = date.today() - timedelta(days=args.days)
+    with SessionLocal() as db:
+        archived = archive_jobs(db, posted_before, args.batch_size)
+        purged = purge_revocations(db, datetime.utcnow())
+    print(f"archived {archived} jobs posted before {posted_before}")
+    print(f"purged {purged} revocations of expired tokens")
+
+
+if __name__ == "__main__":
+    main()
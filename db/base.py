@@ -1,3 +1,6 @@
 from .base_class import Base  # noqa
-from .models.jobs import Job  # noqa
+from .models.jobs import Job, JobArchive  # noqa
+from .models.tokens import RevokedToken  # noqa
 from .models.users import User  # noqa
+from .schema import check_schema  # noqa
+from .search import create_search_index  # noqa
@@ -0,0 +1,86 @@
+"""
+Migrates the database of DATABASE_URL with the Alembic scripts in migrations/.
+
+    python -m db.migrate                     # upgrade to the latest revision
+    python -m db.migrate current             # print the revision of the database
+    python -m db.migrate stamp 0001          # adopt a database made by create_all
+    python -m db.migrate downgrade 0001
+
+Run it once per deployment, before starting the new workers; the workers only check
+the revision (see `db.schema.check_schema`).
+"""
+import argparse
+import logging
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from core.config import settings
+from db.schema import current_schema_version
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# An arbitrary key of the Postgres advisory lock serializing concurrent migrations.
+MIGRATION_LOCK_KEY = 7234001
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    """
+    Returns the Alembic configuration of the repository, usable from any directory.
+    """
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    config.attributes["configure_logger"] = False
+    config.attributes["connection"] = connection
+    return config
+
+
+def run(
+    command_name: str, revision: Optional[str] = None, engine: Optional[Engine] = None
+) -> Optional[str]:
+    """
+    Runs an Alembic command in a single transaction.
+
+    On Postgres the transaction first takes an advisory lock, so that deployments
+    starting several migrators at once apply each migration only once.
+
+    Args:
+        command_name (str): "upgrade", "downgrade", "stamp" or "current".
+        revision (Optional[str]): The target revision of the command.
+        engine (Optional[Engine]): The database, by default the one of DATABASE_URL.
+
+    Returns:
+        Optional[str]: The revision of the database after the command.
+    """
+    engine = engine or create_engine(settings.DATABASE_URL)
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(
+                text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+        if command_name == "current":
+            return current_schema_version(connection)
+        getattr(command, command_name)(alembic_config(connection), revision)
+        return current_schema_version(connection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="upgrade",
+        choices=["upgrade", "downgrade", "stamp", "current"],
+    )
+    parser.add_argument("revision", nargs="?", default="head")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"database at revision {run(args.command, args.revision)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,17 @@
-from sqlalchemy import Boolean, Column, Date, ForeignKey, Integer, String
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+    true,
+)
 from sqlalchemy.orm import relationship
 
 from db.base_class import Base
@@ -8,6 +21,14 @@ class Job(Base):
     """
     A Job represents a job posting, with details such as job title, company, location,
     description, and the id of the user who owns the job.
+
+    `job_version` is incremented and `job_updated_at` (UTC) refreshed on every update,
+    they provide the ETag and Last-Modified validators of job responses.
+
+    The composite indexes back the keyset paginated listing, which walks postings
+    newest first on (job_date_posted, job_id), optionally narrowed by location, company
+    or owner. The main listing index only covers active jobs; expired jobs are moved
+    to `JobArchive` by `db.archive`.
     """
 
     job_id = Column(Integer, primary_key=True, index=True)
@@ -16,7 +37,61 @@ class Job(Base):
     job_company_url = Column(String)
     job_location = Column(String, nullable=False)
     job_description = Column(String, nullable=False)
-    job_date_posted = Column(Date)
+    job_date_posted = Column(
+        Date, nullable=False, default=date.today, server_default=func.current_date()
+    )
     job_is_active = Column(Boolean(), default=True)
     job_owner_id = Column(Integer, ForeignKey("user.id"))
     job_owner = relationship("User", back_populates="jobs")
+    job_version = Column(Integer, nullable=False, default=1, server_default="1")
+    job_updated_at = Column(
+        DateTime, nullable=False, default=datetime.utcnow, server_default=func.now()
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_job_active_posted",
+            "job_date_posted",
+            "job_id",
+            # Spelled like the filter SQLAlchemy renders for `Job.job_is_active`,
+            # SQLite only uses a partial index for a matching filter.
+            sqlite_where=job_is_active == true(),
+            postgresql_where=job_is_active == true(),
+        ),
+        Index("ix_job_location_posted", "job_location", "job_date_posted", "job_id"),
+        Index("ix_job_company_posted", "job_company", "job_date_posted", "job_id"),
+        Index(
+            "ix_job_owner_active_posted",
+            "job_owner_id",
+            "job_is_active",
+            "job_date_posted",
+            "job_id",
+        ),
+        # Ids of archived jobs must never be handed out again.
+        {"sqlite_autoincrement": True},
+    )
+
+
+class JobArchive(Base):
+    """
+    An expired job posting, moved out of the `job` table by `db.archive` so that the
+    table and its indexes only grow with the live postings.
+
+    It keeps the columns of `Job`, so archived jobs are served by id like live ones,
+    plus the time the job was archived.
+    """
+
+    __tablename__ = "job_archive"
+
+    job_id = Column(Integer, primary_key=True)
+    job_title = Column(String, nullable=False)
+    job_company = Column(String, nullable=False)
+    job_company_url = Column(String)
+    job_location = Column(String, nullable=False)
+    job_description = Column(String, nullable=False)
+    job_date_posted = Column(Date, nullable=False)
+    job_is_active = Column(Boolean(), default=False)
+    job_owner_id = Column(Integer, ForeignKey("user.id"))
+    job_version = Column(Integer, nullable=False)
+    job_updated_at = Column(DateTime, nullable=False)
+    job_archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from db.base_class import Base
+
+
+class RevokedToken(Base):
+    """
+    A RevokedToken records a token revoked before it expires, by logout or by the
+    rotation of a refresh token.
+
+    Rows are only needed until the token expires, `db.archive` purges older ones. Every
+    worker loads the rows added since its last sync, by id, into its in-memory
+    revocation index (see `core.revocation`).
+
+    Attributes:
+        id (Integer): The unique id of the revocation.
+        jti (String): The `jti` claim of the revoked token.
+        expires_at (DateTime): When the token expires (UTC).
+        revoked_at (DateTime): When the token was revoked (UTC).
+    """
+
+    __tablename__ = "revoked_token"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, nullable=False, unique=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = {"sqlite_autoincrement": True}
@@ -19,6 +19,8 @@ class User(Base):
         is_active (Boolean): Whether the User is active.
         is_superuser (Boolean): Whether the User is a superuser.
         jobs (Relationship): The relationship with the Job class, where a User can have many Jobs.
+            It is never loaded implicitly: accessing it raises unless it was loaded with
+            a loader option, list a user's jobs with `list_jobs_async(owner_id=...)` instead.
     """
 
     id = Column(Integer, primary_key=True, index=True)
@@ -28,4 +30,4 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
-    jobs = relationship("Job", back_populates="job_owner")
+    jobs = relationship("Job", back_populates="job_owner", lazy="raise")
@@ -1,41 +1,330 @@
-from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from db.models.jobs import Job
-from schemas.jobs import JobCreate
+from sqlalchemy import and_, delete, insert, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.cache import ReadThroughCache, build_cache_backend
+from core.config import settings
+from db.models.jobs import Job, JobArchive
+from db.search import POSTGRES_SEARCH_SQL, SQLITE_SEARCH_SQL, sqlite_match_expression
+from schemas.jobs import JobCreate, JobSummary, ShowJob
 
-def retreive_job(id: int, db: Session):
-    item = db.query(Job).filter(Job.job_id == id).first()
+# Outcomes of the conditional update and delete operations.
+JOB_NOT_FOUND = 0
+JOB_CHANGED = 1
+JOB_FORBIDDEN = -1
+
+# Listings read only the columns of their response schema and the validators of each
+# job, so large columns of the table never leave the database for them.
+_JOB_VALIDATOR_COLUMNS = [Job.job_version, Job.job_updated_at]
+JOB_LIST_COLUMNS = [
+    getattr(Job, name) for name in ShowJob.__fields__
+] + _JOB_VALIDATOR_COLUMNS
+JOB_SUMMARY_COLUMNS = [
+    getattr(Job, name) for name in JobSummary.__fields__
+] + _JOB_VALIDATOR_COLUMNS
+
+# Serialized job representations by job id, filled by the read endpoint and
+# invalidated by the write operations below once their transaction commits. Writers
+# bypassing them (scripts, the shell) are only caught up by the TTL, as are other
+# workers when the backend is per-process memory.
+job_cache = ReadThroughCache(
+    build_cache_backend(
+        settings.JOB_CACHE_BACKEND,
+        maxsize=settings.JOB_CACHE_SIZE,
+        ttl=settings.JOB_CACHE_TTL,
+        prefix="jobs-api:",
+    ),
+    prefix="job:",
+)
+
+
+async def retreive_job_async(id: int, db: AsyncSession):
+    """
+    Returns the job with this id, looking in the archive when it is not live, or None.
+    """
+    result = await db.execute(select(Job).where(Job.job_id == id))
+    item = result.scalars().first()
+    if item is None:
+        result = await db.execute(select(JobArchive).where(JobArchive.job_id == id))
+        item = result.scalars().first()
     return item
 
 
-def create_new_job(job: JobCreate, db: Session, job_owner_id: int):
+def _job_version_statement(id: int, table=Job):
+    return select(table.job_version, table.job_updated_at).where(table.job_id == id)
+
+
+async def get_job_version_async(id: int, db: AsyncSession):
+    """
+    Returns the (job_version, job_updated_at) of a job, live or archived, or None if
+    it does not exist.
+
+    This reads two columns by primary key, enough to answer a conditional request
+    without loading the job.
+    """
+    version = (await db.execute(_job_version_statement(id))).first()
+    if version is None:
+        version = (await db.execute(_job_version_statement(id, JobArchive))).first()
+    return version
+
+
+async def create_new_job_async(job: JobCreate, db: AsyncSession, job_owner_id: int):
+    # The session does not expire objects on commit and column defaults are applied
+    # by the flush, so no refresh query is needed.
     job_object = Job(**job.dict(), job_owner_id=job_owner_id)
     db.add(job_object)
-    db.commit()
-    db.refresh(job_object)
+    await db.commit()
+    # SQLite may reuse the id of a deleted job, which could still be cached.
+    await job_cache.invalidate(job_object.job_id)
     return job_object
 
 
-def list_jobs(db: Session):
-    jobs = db.query(Job).filter(Job.job_is_active).all()
-    return jobs
+async def create_new_jobs_async(
+    jobs: List[JobCreate], db: AsyncSession, job_owner_id: int
+) -> List[int]:
+    """
+    Inserts a batch of jobs in a single transaction.
+
+    On Postgres the whole batch is one multi-row INSERT ... RETURNING statement.
+    Other databases cannot return generated ids from a multi-row insert, so the
+    batch is flushed through the ORM; on SQLite those per-row inserts are
+    in-process calls rather than network round trips.
+
+    Args:
+        jobs (List[JobCreate]): The validated jobs to insert.
+        db (AsyncSession): The database session.
+        job_owner_id (int): The id of the user owning every job of the batch.
+
+    Returns:
+        List[int]: The ids of the new jobs, in the order of `jobs`.
+    """
+    rows = [{**job.dict(), "job_owner_id": job_owner_id} for job in jobs]
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(insert(Job).values(rows).returning(Job.job_id))
+        job_ids = result.scalars().all()
+    else:
+        job_objects = [Job(**row) for row in rows]
+        db.add_all(job_objects)
+        await db.flush()
+        job_ids = [job_object.job_id for job_object in job_objects]
+    await db.commit()
+    await job_cache.invalidate(*job_ids)
+    return job_ids
+
+
+def _list_jobs_statement(
+    limit: int,
+    after: Optional[Tuple[date, int]],
+    location: Optional[str],
+    company: Optional[str],
+    posted_after: Optional[date],
+    owner_id: Optional[int],
+    summary: bool,
+):
+    columns = JOB_SUMMARY_COLUMNS if summary else JOB_LIST_COLUMNS
+    statement = select(*columns).where(Job.job_is_active)
+    if owner_id is not None:
+        statement = statement.where(Job.job_owner_id == owner_id)
+    if location is not None:
+        statement = statement.where(Job.job_location == location)
+    if company is not None:
+        statement = statement.where(Job.job_company == company)
+    if posted_after is not None:
+        statement = statement.where(Job.job_date_posted >= posted_after)
+    if after is not None:
+        last_date_posted, last_id = after
+        statement = statement.where(
+            or_(
+                Job.job_date_posted < last_date_posted,
+                and_(Job.job_date_posted == last_date_posted, Job.job_id < last_id),
+            )
+        )
+    return statement.order_by(Job.job_date_posted.desc(), Job.job_id.desc()).limit(
+        limit
+    )
+
+
+async def list_jobs_async(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[Tuple[date, int]] = None,
+    location: Optional[str] = None,
+    company: Optional[str] = None,
+    posted_after: Optional[date] = None,
+    owner_id: Optional[int] = None,
+    summary: bool = False,
+):
+    """
+    Lists active jobs newest first using keyset pagination on (job_date_posted, job_id).
+
+    Only the columns of `ShowJob` and the job validators are selected, as plain rows
+    that are not tracked by the session.
+
+    Args:
+        db (AsyncSession): The database session.
+        limit (int): The maximum number of jobs to return.
+        after (Optional[Tuple[date, int]]): The (job_date_posted, job_id) of the last job
+            of the previous page, or None for the first page.
+        location (Optional[str]): Only return jobs with this exact location.
+        company (Optional[str]): Only return jobs from this exact company.
+        posted_after (Optional[date]): Only return jobs posted on or after this date.
+        owner_id (Optional[int]): Only return jobs owned by this user.
+        summary (bool): Select the columns of `JobSummary`, without the description.
+
+    Returns:
+        List[Row]: At most `limit` rows, with the columns as attributes.
+    """
+    statement = _list_jobs_statement(
+        limit, after, location, company, posted_after, owner_id, summary
+    )
+    result = await db.execute(statement)
+    return result.all()
+
+
+def _search_jobs_statement(query: str, dialect: str, limit: int, offset: int):
+    if dialect == "sqlite":
+        match = sqlite_match_expression(query)
+        if not match:
+            return None, {}
+        params = {"query": match, "limit": limit, "offset": offset}
+        return select(Job).from_statement(text(SQLITE_SEARCH_SQL)), params
+    if dialect == "postgresql":
+        params = {"query": query, "limit": limit, "offset": offset}
+        return select(Job).from_statement(text(POSTGRES_SEARCH_SQL)), params
+    pattern = f"%{query}%"
+    statement = (
+        select(Job)
+        .where(Job.job_is_active)
+        .where(or_(Job.job_title.ilike(pattern), Job.job_description.ilike(pattern)))
+        .order_by(Job.job_id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return statement, {}
+
+
+async def search_jobs_async(query: str, db: AsyncSession, limit: int, offset: int = 0):
+    """
+    Full-text search over active jobs, best matches first.
+
+    Uses the FTS5 index with BM25 ranking on SQLite and the `tsvector` GIN index on
+    Postgres (see `db/search.py`). Other databases fall back to an unranked substring
+    match on title and description.
+
+    Args:
+        query (str): The free text typed by the user.
+        db (AsyncSession): The database session.
+        limit (int): The maximum number of jobs to return.
+        offset (int): The number of ranked results to skip.
+
+    Returns:
+        List[Job]: The matching jobs.
+    """
+    dialect = db.bind.dialect.name
+    statement, params = _search_jobs_statement(query, dialect, limit, offset)
+    if statement is None:
+        return []
+    result = await db.execute(statement, params)
+    return result.scalars().all()
+
+
+async def stream_jobs_async(
+    db: AsyncSession, batch_size: int = 1000
+) -> AsyncIterator[Job]:
+    """
+    Iterates over every active job in job_id order without loading them all at once.
+
+    Rows are fetched through a server-side cursor in batches of `batch_size`, so memory
+    use stays flat however large the table is.
+
+    Args:
+        db (AsyncSession): The database session.
+        batch_size (int): The number of rows fetched from the cursor at a time.
+
+    Yields:
+        Job: The active jobs.
+    """
+    statement = (
+        select(Job)
+        .where(Job.job_is_active)
+        .order_by(Job.job_id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(statement)
+    async for job in result.scalars():
+        yield job
+
+
+def _owned_job(id: int, job_owner_id: int, is_superuser: bool):
+    condition = Job.job_id == id
+    if not is_superuser:
+        condition = and_(condition, Job.job_owner_id == job_owner_id)
+    return condition
+
+
+def _job_exists_statement(id: int):
+    return select(Job.job_id).where(Job.job_id == id)
+
+
+async def update_job_by_id_async(
+    id: int, job: JobCreate, db: AsyncSession, job_owner_id, is_superuser: bool = False
+):
+    """
+    Updates a job in a single conditional UPDATE that only matches if the job is
+    owned by `job_owner_id` or the user is a superuser.
+
+    Only when nothing matched is a second, indexed lookup issued to tell a missing
+    job from one owned by someone else.
+
+    Args:
+        id (int): The id of the job to update.
+        job (JobCreate): The new job details.
+        db (AsyncSession): The database session.
+        job_owner_id (int): The id of the user performing the update.
+        is_superuser (bool): Whether that user may update any job.
 
+    Returns:
+        int: JOB_CHANGED, JOB_NOT_FOUND or JOB_FORBIDDEN.
+    """
+    result = await db.execute(
+        update(Job)
+        .where(_owned_job(id, job_owner_id, is_superuser))
+        .values(
+            **job.dict(),
+            job_version=Job.job_version + 1,
+            job_updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        await job_cache.invalidate(id)
+        return JOB_CHANGED
+    if (await db.execute(_job_exists_statement(id))).first() is None:
+        return JOB_NOT_FOUND
+    return JOB_FORBIDDEN
 
-def update_job_by_id(id: int, job: JobCreate, db: Session, job_owner_id):
-    existing_job = db.query(Job).filter(Job.job_id == id)
-    if not existing_job.first():
-        return 0
-    job.__dict__.update(job_owner_id=job_owner_id)
-    existing_job.update(job.__dict__)
-    db.commit()
-    return 1
 
+async def delete_job_by_id_async(
+    id: int, db: AsyncSession, job_owner_id, is_superuser: bool = False
+):
+    """
+    Deletes a job in a single conditional DELETE, like `update_job_by_id_async`.
 
-def delete_job_by_id(id: int, db: Session, job_owner_id):
-    existing_job = db.query(Job).filter(Job.job_id == id)
-    if not existing_job.first():
-        return 0
-    existing_job.delete(synchronize_session=False)
-    db.commit()
-    return 1
+    Returns:
+        int: JOB_CHANGED, JOB_NOT_FOUND or JOB_FORBIDDEN.
+    """
+    result = await db.execute(
+        delete(Job)
+        .where(_owned_job(id, job_owner_id, is_superuser))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if result.rowcount:
+        await job_cache.invalidate(id)
+        return JOB_CHANGED
+    if (await db.execute(_job_exists_statement(id))).first() is None:
+        return JOB_NOT_FOUND
+    return JOB_FORBIDDEN
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import List, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.models.tokens import RevokedToken
+
+
+async def revoke_token_async(jti: str, expires_at: datetime, db: AsyncSession) -> bool:
+    """
+    Records the token `jti` as revoked until `expires_at`.
+
+    The insert is the atomic check: `jti` is unique, so of concurrent revocations of
+    one token, in any worker, exactly one succeeds.
+
+    Returns:
+        bool: True if the token was revoked by this call, False if it already was.
+    """
+    try:
+        await db.execute(
+            insert(RevokedToken).values(
+                jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()
+            )
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    return True
+
+
+async def is_token_revoked_async(jti: str, db: AsyncSession) -> bool:
+    """
+    Returns whether the token `jti` was revoked.
+    """
+    result = await db.execute(select(RevokedToken.id).where(RevokedToken.jti == jti))
+    return result.first() is not None
+
+
+async def list_revocations_async(
+    db: AsyncSession, after: int, now: datetime
+) -> List[Tuple[int, str]]:
+    """
+    Returns the (id, jti) of the revocations of unexpired tokens recorded after the
+    revocation `after`, in id order.
+    """
+    result = await db.execute(
+        select(RevokedToken.id, RevokedToken.jti)
+        .where(RevokedToken.id > after, RevokedToken.expires_at > now)
+        .order_by(RevokedToken.id)
+    )
+    return result.all()
+
+
+def purge_revocations(db: Session, now: datetime) -> int:
+    """
+    Deletes the revocations of tokens expired at `now` and returns their number.
+    """
+    result = db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+    db.commit()
+    return result.rowcount
@@ -1,17 +1,49 @@
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from core.cache import TTLCache
+from core.config import settings
 from core.hashing import Hasher
 from db.models.users import User
-from schemas.users import UserCreate
+from schemas.users import ShowUser, UserCreate
+
+# The user list only reads the columns it shows and its keyset, never the password
+# hashes.
+USER_LIST_COLUMNS = [User.id] + [getattr(User, name) for name in ShowUser.__fields__]
+
+# Planner statistics of the user table, kept up to date by autovacuum and ANALYZE;
+# -1 until the table is first analyzed.
+POSTGRES_USER_ESTIMATE_SQL = text(
+    "SELECT reltuples::bigint FROM pg_class WHERE oid = 'public.\"user\"'::regclass"
+)
+
+# Compares above every character a prefix can be followed by.
+_PREFIX_UPPER_BOUND = "\U0010ffff"
+
+# Emails recently looked up by a login without a match, so repeated logins for
+# accounts that do not exist do not query the database. The cache is per process:
+# creating a user drops its email on this worker only, so a user registered through
+# another worker can log in here once the entry expires, after USER_MISS_CACHE_TTL
+# seconds. Registrations and token checks always query the database.
+user_miss_cache = TTLCache(
+    maxsize=settings.USER_MISS_CACHE_SIZE, ttl=settings.USER_MISS_CACHE_TTL
+)
 
 
-def create_new_user(user: UserCreate, db: Session):
+def create_new_user(
+    user: UserCreate, db: Session, hashed_password: Optional[str] = None
+):
     """
     Creates a new user in the database with the provided user information.
 
     Args:
         user (UserCreate): The user information to create a new user.
         db (Session): The database session to use for creating the user.
+        hashed_password (Optional[str]): The already hashed password, hashed here from
+            `user.password` if None.
 
     Returns:
         User: The newly created user object.
@@ -19,29 +51,118 @@ def create_new_user(user: UserCreate, db: Session):
     user = User(
         username=user.username,
         email=user.email,
-        hashed_password=Hasher.get_password_hash(user.password),
+        hashed_password=hashed_password or Hasher.get_password_hash(user.password),
         is_active=True,
         is_superuser=False,
     )
     db.add(user)
     db.commit()
     db.refresh(user)
+    user_miss_cache.pop(user.email)
+
+    return user
+
+
+async def create_new_user_async(
+    user: UserCreate, db: AsyncSession, hashed_password: Optional[str] = None
+):
+    """
+    Asyncio version of `create_new_user`.
+
+    Pass `hashed_password` computed with `Hasher.get_password_hash_async`, otherwise
+    the password is hashed synchronously on the event loop.
+    """
+    user = User(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password or Hasher.get_password_hash(user.password),
+        is_active=True,
+        is_superuser=False,
+    )
+    db.add(user)
+    await db.commit()
+    user_miss_cache.pop(user.email)
 
     return user
 
 
-def list_users(db: Session):
+def _prefix_match(column, prefix: str, dialect: str):
+    # A range rather than LIKE, which SQLite evaluates case-insensitively and so
+    # cannot answer from the index of the column. The range only holds in code point
+    # order: on Postgres it is compared, and indexed by migration 0006, in the "C"
+    # collation rather than the locale of the database.
+    if dialect == "postgresql":
+        column = column.collate("C")
+    return and_(column >= prefix, column < prefix + _PREFIX_UPPER_BOUND)
+
+
+def _list_users_statement(
+    limit: int, after: Optional[int], prefix: Optional[str], dialect: str
+):
+    statement = select(*USER_LIST_COLUMNS)
+    if prefix:
+        statement = statement.where(
+            or_(
+                _prefix_match(User.username, prefix, dialect),
+                _prefix_match(User.email, prefix, dialect),
+            )
+        )
+    if after is not None:
+        statement = statement.where(User.id > after)
+    return statement.order_by(User.id).limit(limit)
+
+
+async def list_users_async(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[int] = None,
+    prefix: Optional[str] = None,
+) -> List:
+    """
+    Lists users by id using keyset pagination.
+
+    Parameters:
+        db (AsyncSession): The database session object.
+        limit (int): The maximum number of users to return.
+        after (Optional[int]): The id of the last user of the previous page, or None
+            for the first page.
+        prefix (Optional[str]): Only return users whose username or email starts with
+            this prefix (case-sensitive). The match is a range scan of the username
+            and email indexes.
+
+    Returns:
+        List[Row]: The id and `ShowUser` columns of at most `limit` users.
+    """
+    result = await db.execute(
+        _list_users_statement(limit, after, prefix, db.bind.dialect.name)
+    )
+    return result.all()
+
+
+async def estimate_user_count_async(db: AsyncSession) -> int:
     """
-    Retrieves a list of all users from the database.
+    Estimates the number of users without scanning the table.
+
+    Postgres reports the planner statistics of the table. Elsewhere, and before the
+    first ANALYZE, the highest user id is used, which counts deleted users too.
 
     Parameters:
-        db (Session): The database session object.
+        db (AsyncSession): The database session object.
 
     Returns:
-        List[User]: A list of User objects representing all the users in the database.
+        int: The estimated number of users.
     """
-    users = db.query(User).all()
-    return users
+    estimate = None
+    if db.bind.dialect.name == "postgresql":
+        estimate = (await db.execute(POSTGRES_USER_ESTIMATE_SQL)).scalar()
+    if estimate is None or estimate < 0:
+        estimate = (await db.execute(select(func.max(User.id)))).scalar()
+    return int(estimate or 0)
+
+
+def _user_by_email_statement(email: str):
+    # Answered from the unique index on the email column.
+    return select(User).where(User.email == email).limit(1)
 
 
 def get_user_by_email(email: str, db: Session):
@@ -55,5 +176,22 @@ def get_user_by_email(email: str, db: Session):
     Returns:
     User: The user object corresponding to the provided email, or None if not found.
     """
-    user = db.query(User).filter(User.email == email).first()
+    return db.execute(_user_by_email_statement(email)).scalars().first()
+
+
+async def get_user_by_email_async(
+    email: str, db: AsyncSession, cache_miss: bool = False
+):
+    """
+    Asyncio version of `get_user_by_email`.
+
+    With `cache_miss`, emails without a match are answered from and remembered in
+    `user_miss_cache`; only logins use it, see `user_miss_cache`.
+    """
+    if cache_miss and user_miss_cache.get(email):
+        return None
+    result = await db.execute(_user_by_email_statement(email))
+    user = result.scalars().first()
+    if user is None and cache_miss:
+        user_miss_cache.set(email, True)
     return user
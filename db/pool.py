@@ -0,0 +1,97 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Counters describing how long requests wait to check a connection out of a pool.
+
+    Attributes:
+        checkouts (int): The number of successful checkouts.
+        timeouts (int): The number of checkouts that gave up after `pool_timeout`.
+        wait_seconds_total (float): The total time spent in checkouts, including timeouts.
+        wait_seconds_max (float): The longest single checkout.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _TimedCheckoutMixin:
+    """
+    Times every checkout of a queue pool, including the wait for a free connection
+    and the pre-ping, and keeps the counters across `engine.dispose()`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the checkout counters together with the current pool occupancy.
+        """
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            **self.metrics.snapshot(),
+        }
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    """
+    Opens a connection per checkout, timing it like the queue pools.
+    """
+
+    def stats(self) -> Dict[str, float]:
+        return {"size": 0, "checked_out": 0, "overflow": 0, **self.metrics.snapshot()}
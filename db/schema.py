@@ -0,0 +1,65 @@
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+# The revision of the newest migration in migrations/versions. Bump it with every new
+# migration; the test suite checks that it matches the head of the scripts.
+SCHEMA_VERSION = "0006"
+
+
+class SchemaOutOfDate(RuntimeError):
+    """
+    Raised at startup when the database is not at `SCHEMA_VERSION`.
+    """
+
+
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """
+    Alembic filter leaving the full-text index (see db/search.py) and the Postgres
+    prefix indexes of users (see migration 0006), created with raw DDL by the
+    migrations, and SQLite's internal tables out of autogenerate comparisons.
+    """
+    if type_ == "table" and name.startswith(("job_fts", "sqlite_")):
+        return False
+    return name not in (
+        "job_search",
+        "ix_job_search",
+        "ix_user_username_prefix",
+        "ix_user_email_prefix",
+    )
+
+
+def current_schema_version(connection: Connection) -> Optional[str]:
+    """
+    Returns the migration revision recorded in the database, or None if it has never
+    been migrated.
+    """
+    try:
+        return connection.execute(
+            text("SELECT version_num FROM alembic_version")
+        ).scalar()
+    except DBAPIError:
+        # The version table does not exist yet.
+        return None
+
+
+def check_schema(engine: Engine) -> None:
+    """
+    Checks that the database has been migrated to `SCHEMA_VERSION`.
+
+    This is a single query on a one row table, without importing Alembic or reading
+    the migration scripts, so any number of workers can start at once without
+    loading the database. Migrations themselves are run by `python -m db.migrate`.
+
+    Raises:
+        SchemaOutOfDate: If the database is at another revision, or not migrated.
+    """
+    with engine.connect() as connection:
+        version = current_schema_version(connection)
+    if version != SCHEMA_VERSION:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {version}, expected {SCHEMA_VERSION}; "
+            "run `python -m db.migrate`"
+        )
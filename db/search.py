@@ -0,0 +1,123 @@
+from typing import List
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+
+from db.models.jobs import Job
+
+JOB_COLUMNS = ", ".join(f"job.{column.name}" for column in Job.__table__.columns)
+
+SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS job_fts USING fts5(
+        job_title, job_company, job_description,
+        content='job', content_rowid='job_id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_fts_insert AFTER INSERT ON job BEGIN
+        INSERT INTO job_fts(rowid, job_title, job_company, job_description)
+        VALUES (new.job_id, new.job_title, new.job_company, new.job_description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_fts_delete AFTER DELETE ON job BEGIN
+        INSERT INTO job_fts(job_fts, rowid, job_title, job_company, job_description)
+        VALUES ('delete', old.job_id, old.job_title, old.job_company, old.job_description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS job_fts_update AFTER UPDATE ON job BEGIN
+        INSERT INTO job_fts(job_fts, rowid, job_title, job_company, job_description)
+        VALUES ('delete', old.job_id, old.job_title, old.job_company, old.job_description);
+        INSERT INTO job_fts(rowid, job_title, job_company, job_description)
+        VALUES (new.job_id, new.job_title, new.job_company, new.job_description);
+    END
+    """,
+    "INSERT INTO job_fts(job_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_SEARCH_DDL = [
+    """
+    ALTER TABLE job ADD COLUMN IF NOT EXISTS job_search tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(job_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(job_company, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(job_description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_job_search ON job USING GIN (job_search)",
+]
+
+# bm25() weights follow the column order of job_fts: title, company, description.
+SQLITE_SEARCH_SQL = f"""
+    SELECT {JOB_COLUMNS} FROM job_fts JOIN job ON job.job_id = job_fts.rowid
+    WHERE job_fts MATCH :query AND job.job_is_active
+    ORDER BY bm25(job_fts, 10.0, 5.0, 1.0), job.job_id
+    LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_SEARCH_SQL = f"""
+    SELECT {JOB_COLUMNS} FROM job, websearch_to_tsquery('english', :query) AS query
+    WHERE job.job_search @@ query AND job.job_is_active
+    ORDER BY ts_rank_cd(job.job_search, query) DESC, job.job_id
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def sqlite_match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 MATCH expression requiring every term.
+
+    Each term is quoted so that FTS5 operators and punctuation typed by users are
+    matched literally instead of raising a syntax error.
+    """
+    terms: List[str] = query.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def create_search_index(connection: Connection) -> None:
+    """
+    Creates the full-text index over job postings if it does not exist yet.
+
+    On SQLite this is an external content FTS5 table kept in sync with `job` by
+    triggers; on Postgres a generated `tsvector` column with a GIN index. Other
+    databases are left untouched and fall back to unranked substring search.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'job_fts'")
+        ).first()
+        if exists:
+            return
+        for statement in SQLITE_SEARCH_DDL:
+            connection.execute(text(statement))
+    elif dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection: Connection) -> None:
+    """
+    Drops the full-text index created by `create_search_index`, if any.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for trigger in ("job_fts_insert", "job_fts_delete", "job_fts_update"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        connection.execute(text("DROP TABLE IF EXISTS job_fts"))
+    elif dialect == "postgresql":
+        connection.execute(text("DROP INDEX IF EXISTS ix_job_search"))
+        connection.execute(text("ALTER TABLE job DROP COLUMN IF EXISTS job_search"))
+
+
+@event.listens_for(Job.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Job.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        drop_search_index(connection)
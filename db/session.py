@@ -1,28 +1,124 @@
-from typing import Generator
+import time
+from typing import AsyncGenerator, Dict, Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from core.config import settings
+from core.metrics import record_query
+from db.pool import TimedAsyncAdaptedQueuePool, TimedNullPool, TimedQueuePool
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Returns the URL of the same database using its asyncio driver
+    (aiosqlite for SQLite, asyncpg for Postgres).
+    """
+    scheme, rest = url.split("://", 1)
+    backend = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(backend, scheme)}://{rest}"
+
+
+def engine_options(url: str, asyncio: bool = False) -> dict:
+    """
+    Builds the `create_engine` keyword arguments for a database URL from the
+    DB_POOL_* settings.
+
+    File databases get a sized queue pool with checkout timing. In-memory SQLite
+    keeps SQLAlchemy's default single connection pool. aiosqlite opens a connection
+    per checkout, still timed: each pooled aiosqlite connection would own a
+    non-daemon thread keeping the process alive until the engine is disposed, which
+    the Lambda handler, running without lifespan events, never does.
+    """
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+        if asyncio:
+            options["poolclass"] = TimedNullPool
+            return options
+    options.update(
+        poolclass=TimedAsyncAdaptedQueuePool if asyncio else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def configure_sqlite(engine: Engine) -> None:
+    """
+    Applies the SQLITE_* pragmas to every new connection of a SQLite engine.
+
+    WAL lets readers proceed while a write is in progress, and synchronous=NORMAL
+    only syncs at checkpoints, which is safe from corruption in WAL mode.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.close()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Counts the statements executed by `engine`, and the time they take, in the stats
+    of the request being handled (see `core.metrics.TimingMiddleware`).
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        record_query(time.perf_counter() - conn.info["query_start_time"].pop())
 
-"""
-if you don't want to install postgres or any database, use sqlite,
-a file system based database, uncomment below lines if you would like
-to use sqlite and comment above 2 lines of SQLALCHEMY_DATABASE_URL AND engine
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-"""
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL)
 )
+configure_sqlite(engine)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, asyncio=True)
+)
+configure_sqlite(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+def pool_stats() -> Dict[str, dict]:
+    """
+    Returns the occupancy and checkout wait counters of the sync and async pools.
+    """
+    return {
+        name: pool.stats() if hasattr(pool, "stats") else {"status": pool.status()}
+        for name, pool in (
+            ("sync", engine.pool),
+            ("async", async_engine.sync_engine.pool),
+        )
+    }
+
 
 def get_db() -> Generator:
     """
@@ -33,3 +129,14 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Yields an asyncio database session and ensures it's closed properly.
+
+    Queries are awaited on the event loop instead of holding a threadpool worker
+    while the database answers.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,11 +1,10 @@
-import os
-
 from fastapi import FastAPI
 from mangum import Mangum
 
 from core.config import settings
-from db.base import Base
-from db.session import engine
+from core.metrics import TimingMiddleware
+from db.base import check_schema
+from db.session import async_engine, engine
 from routing.base import api_router
 
 
@@ -13,12 +12,22 @@ def include_router(app):
     app.include_router(api_router, prefix="/v1")
 
 
-def create_tables():
+def check_database():
     """
-    Create database tables.
+    Check that the database schema is migrated to the revision this code expects.
+
+    With MIGRATE_ON_STARTUP (meant for local development) pending migrations are
+    applied first; deployments run `python -m db.migrate` once instead.
     """
-    print("create database tables")
-    Base.metadata.create_all(bind=engine)
+    if settings.MIGRATE_ON_STARTUP:
+        from db.migrate import run
+
+        run("upgrade", "head", engine)
+    check_schema(engine)
+    if settings.LAMBDA_PRODUCTION:
+        # Requests use the asyncio engine; do not keep the startup connection open
+        # for the lifetime of the Lambda container.
+        engine.dispose()
 
 
 def start_application():
@@ -29,11 +38,21 @@ def start_application():
         app (FastAPI): The configured FastAPI application.
     """
     app = FastAPI(title=settings.PROJECT_NAME, version=settings.PROJECT_VERSION)
+    app.add_middleware(TimingMiddleware, server_timing=settings.SERVER_TIMING_HEADER)
     include_router(app)
-    create_tables()
+    check_database()
+
+    @app.on_event("shutdown")
+    async def dispose_engines():
+        await async_engine.dispose()
+        engine.dispose()
+
     return app
 
 
 app = start_application()
-if "LAMBDA_PRODUCTION" in os.environ and os.environ["LAMBDA_PRODUCTION"] == "true":
-    handler = Mangum(app)
+if settings.LAMBDA_PRODUCTION:
+    # Mangum would otherwise run the startup and shutdown events around every
+    # invocation, disposing the engines and their pooled connections each time.
+    # With lifespan off they live as long as the container.
+    handler = Mangum(app, lifespan="off")
@@ -0,0 +1,58 @@
+"""Baseline schema: users and jobs
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-01-15 10:00:00
+
+The schema `create_all` produced before migrations were introduced. Databases created
+that way are adopted with `python -m db.migrate stamp 0001`, then upgraded.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_superuser", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("username"),
+    )
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+    op.create_index("ix_user_id", "user", ["id"], unique=False)
+    op.create_index("ix_user_phone_number", "user", ["phone_number"], unique=True)
+    op.create_table(
+        "job",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("job_title", sa.String(), nullable=False),
+        sa.Column("job_company", sa.String(), nullable=False),
+        sa.Column("job_company_url", sa.String(), nullable=True),
+        sa.Column("job_location", sa.String(), nullable=False),
+        sa.Column("job_description", sa.String(), nullable=False),
+        sa.Column("job_date_posted", sa.Date(), nullable=True),
+        sa.Column("job_is_active", sa.Boolean(), nullable=True),
+        sa.Column("job_owner_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["job_owner_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.create_index("ix_job_job_id", "job", ["job_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_job_id", table_name="job")
+    op.drop_table("job")
+    op.drop_index("ix_user_phone_number", table_name="user")
+    op.drop_index("ix_user_id", table_name="user")
+    op.drop_index("ix_user_email", table_name="user")
+    op.drop_table("user")
@@ -0,0 +1,63 @@
+"""Job versions, listing indexes and full-text search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-01-15 10:05:00
+
+Adds the job validators (`job_version`, `job_updated_at`), the composite indexes
+of the keyset paginated listings and the full-text search index.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from db.search import create_search_index, drop_search_index
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+LISTING_INDEXES = {
+    "ix_job_active_posted": ["job_is_active", "job_date_posted", "job_id"],
+    "ix_job_location_posted": ["job_location", "job_date_posted", "job_id"],
+    "ix_job_company_posted": ["job_company", "job_date_posted", "job_id"],
+    "ix_job_owner_active_posted": [
+        "job_owner_id",
+        "job_is_active",
+        "job_date_posted",
+        "job_id",
+    ],
+}
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name == "sqlite":
+        # The batch below recreates the job table, which drops the triggers keeping
+        # an existing full-text index in sync; it is rebuilt afterwards.
+        drop_search_index(connection)
+    with op.batch_alter_table("job") as batch_op:
+        batch_op.add_column(
+            sa.Column("job_version", sa.Integer(), nullable=False, server_default="1")
+        )
+        batch_op.add_column(
+            sa.Column(
+                "job_updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.func.now(),
+            )
+        )
+    for name, columns in LISTING_INDEXES.items():
+        op.create_index(name, "job", columns)
+    create_search_index(connection)
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    drop_search_index(connection)
+    for name in LISTING_INDEXES:
+        op.drop_index(name, table_name="job")
+    with op.batch_alter_table("job") as batch_op:
+        batch_op.drop_column("job_updated_at")
+        batch_op.drop_column("job_version")
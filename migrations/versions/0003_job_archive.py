@@ -0,0 +1,70 @@
+"""Job archive and partial index on active jobs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-01-22 09:00:00
+
+Adds the `job_archive` table filled by `db.archive`, and narrows the listing index
+to active jobs. On SQLite job ids become AUTOINCREMENT, so that the id of an archived
+job is never reused by a new one.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from db.search import create_search_index, drop_search_index
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    op.create_table(
+        "job_archive",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("job_title", sa.String(), nullable=False),
+        sa.Column("job_company", sa.String(), nullable=False),
+        sa.Column("job_company_url", sa.String(), nullable=True),
+        sa.Column("job_location", sa.String(), nullable=False),
+        sa.Column("job_description", sa.String(), nullable=False),
+        sa.Column("job_date_posted", sa.Date(), nullable=True),
+        sa.Column("job_is_active", sa.Boolean(), nullable=True),
+        sa.Column("job_owner_id", sa.Integer(), nullable=True),
+        sa.Column("job_version", sa.Integer(), nullable=False),
+        sa.Column("job_updated_at", sa.DateTime(), nullable=False),
+        sa.Column("job_archived_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["job_owner_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("job_id"),
+    )
+    op.drop_index("ix_job_active_posted", table_name="job")
+    if connection.dialect.name == "sqlite":
+        # Recreating the table drops the triggers of the full-text index.
+        drop_search_index(connection)
+        with op.batch_alter_table(
+            "job", recreate="always", table_kwargs={"sqlite_autoincrement": True}
+        ):
+            pass
+        create_search_index(connection)
+    op.create_index(
+        "ix_job_active_posted",
+        "job",
+        ["job_date_posted", "job_id"],
+        sqlite_where=sa.text("job_is_active = 1"),
+        postgresql_where=sa.text("job_is_active = true"),
+    )
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    op.drop_index("ix_job_active_posted", table_name="job")
+    if connection.dialect.name == "sqlite":
+        drop_search_index(connection)
+        with op.batch_alter_table("job", recreate="always"):
+            pass
+        create_search_index(connection)
+    op.create_index(
+        "ix_job_active_posted", "job", ["job_is_active", "job_date_posted", "job_id"]
+    )
+    op.drop_table("job_archive")
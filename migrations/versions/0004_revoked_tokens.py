@@ -0,0 +1,37 @@
+"""Revoked tokens
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-02-05 09:00:00
+
+Adds the `revoked_token` table backing the revocation index of access and refresh
+tokens (see `core.revocation`).
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revoked_token",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("jti", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("revoked_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("jti"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index(
+        "ix_revoked_token_expires_at", "revoked_token", ["expires_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_revoked_token_expires_at", table_name="revoked_token")
+    op.drop_table("revoked_token")
@@ -0,0 +1,92 @@
+"""Job posting date not null
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-02-12 09:00:00
+
+Makes `job_date_posted` NOT NULL, defaulting to the current date. Jobs stored
+without one could neither be paginated past by the keyset listings nor expired by
+`db.archive`; they are given the date of their last update.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+from db.search import create_search_index, drop_search_index
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def _backfill_date_posted(connection, table_name: str) -> None:
+    table = sa.table(
+        table_name,
+        sa.column("job_date_posted", sa.Date()),
+        sa.column("job_updated_at", sa.DateTime()),
+    )
+    if connection.dialect.name == "sqlite":
+        # SQLite has no date type, a CAST would only keep the year.
+        posted = sa.func.date(table.c.job_updated_at)
+    else:
+        posted = sa.cast(table.c.job_updated_at, sa.Date())
+    op.execute(
+        table.update()
+        .where(table.c.job_date_posted.is_(None))
+        .values(job_date_posted=posted)
+    )
+
+
+def _recreate_active_index() -> None:
+    op.create_index(
+        "ix_job_active_posted",
+        "job",
+        ["job_date_posted", "job_id"],
+        sqlite_where=sa.text("job_is_active = 1"),
+        postgresql_where=sa.text("job_is_active = true"),
+    )
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    _backfill_date_posted(connection, "job")
+    _backfill_date_posted(connection, "job_archive")
+    op.drop_index("ix_job_active_posted", table_name="job")
+    if connection.dialect.name == "sqlite":
+        # Recreating the table drops the triggers of the full-text index.
+        drop_search_index(connection)
+    with op.batch_alter_table(
+        "job", table_kwargs={"sqlite_autoincrement": True}
+    ) as batch_op:
+        batch_op.alter_column(
+            "job_date_posted",
+            existing_type=sa.Date(),
+            nullable=False,
+            server_default=sa.func.current_date(),
+        )
+    create_search_index(connection)
+    _recreate_active_index()
+    with op.batch_alter_table("job_archive") as batch_op:
+        batch_op.alter_column(
+            "job_date_posted", existing_type=sa.Date(), nullable=False
+        )
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    with op.batch_alter_table("job_archive") as batch_op:
+        batch_op.alter_column("job_date_posted", existing_type=sa.Date(), nullable=True)
+    op.drop_index("ix_job_active_posted", table_name="job")
+    if connection.dialect.name == "sqlite":
+        drop_search_index(connection)
+    with op.batch_alter_table(
+        "job", table_kwargs={"sqlite_autoincrement": True}
+    ) as batch_op:
+        batch_op.alter_column(
+            "job_date_posted",
+            existing_type=sa.Date(),
+            nullable=True,
+            server_default=None,
+        )
+    create_search_index(connection)
+    _recreate_active_index()
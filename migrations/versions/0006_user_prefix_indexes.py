@@ -0,0 +1,36 @@
+"""User prefix indexes in the C collation
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-02-19 09:00:00
+
+The user listing matches prefixes with a range in code point order. On Postgres it
+is compared in the "C" collation, which the indexes of the username and email
+columns, in the locale collation of the database, cannot answer; these indexes can.
+SQLite compares in code point order already.
+"""
+from alembic import op
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+PREFIX_INDEXES = {
+    "ix_user_username_prefix": "username",
+    "ix_user_email_prefix": "email",
+}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name, column in PREFIX_INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON "user" ({column} COLLATE "C")')
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name in PREFIX_INDEXES:
+        op.execute(f"DROP INDEX {name}")
@@ -1,12 +1,15 @@
 from fastapi import APIRouter
 
-from . import route_jobs, route_login, route_users
+from . import route_jobs, route_login, route_metrics, route_users
 
 api_router = APIRouter()
 
 api_router.include_router(route_users.users_router, prefix="/users", tags=["users"])
 api_router.include_router(route_jobs.job_router, prefix="/jobs", tags=["jobs"])
 api_router.include_router(route_login.login_router, prefix="/login", tags=["login"])
+api_router.include_router(
+    route_metrics.metrics_router, prefix="/metrics", tags=["metrics"]
+)
 
 api_router.include_router(route_login.login_router, tags=["login"])
 
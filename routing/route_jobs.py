@@ -1,23 +1,157 @@
-from typing import List
+import csv
+import hashlib
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.security import get_current_user_from_token
-from db.models.users import User
+from core.config import settings
+from core.pagination import decode_cursor, encode_cursor
+from core.security import UserSnapshot, get_current_user_from_token
+from core.serialization import FastJSONResponse, dumps
 from db.operations.jobs import (
-    create_new_job,
-    delete_job_by_id,
-    list_jobs,
-    retreive_job,
-    update_job_by_id,
+    JOB_FORBIDDEN,
+    JOB_NOT_FOUND,
+    create_new_job_async,
+    create_new_jobs_async,
+    delete_job_by_id_async,
+    get_job_version_async,
+    job_cache,
+    list_jobs_async,
+    retreive_job_async,
+    search_jobs_async,
+    stream_jobs_async,
+    update_job_by_id_async,
+)
+from db.session import get_async_db
+from routing.utils import http_date, is_not_modified
+from schemas.jobs import (
+    BulkJobResponse,
+    BulkJobResult,
+    JobCreate,
+    ShowJob,
+    serialize_job,
+    serialize_job_summary,
 )
-from db.session import get_db
-from schemas.jobs import JobCreate, ShowJob
 
 job_router = APIRouter()
 
 
+def _job_validators(job_id: int, job_version: int, job_updated_at) -> dict:
+    return {
+        "ETag": f'"{job_id}-{job_version}"',
+        "Last-Modified": http_date(job_updated_at),
+    }
+
+
+def _pack_job_entry(etag: str, job_updated_at: datetime, body: bytes) -> bytes:
+    """
+    Stores the validators of a job in front of its serialized body.
+    """
+    return f"{etag}\n{job_updated_at.isoformat()}\n".encode() + body
+
+
+def _unpack_job_entry(entry: bytes) -> Tuple[str, datetime, bytes]:
+    etag, updated_at, body = entry.split(b"\n", 2)
+    return etag.decode(), datetime.fromisoformat(updated_at.decode()), body
+
+
+def decode_jobs_cursor(cursor: Optional[str]) -> Optional[Tuple[date, int]]:
+    """
+    Decodes the cursor of a job listing into the keyset of the last job of the
+    previous page, or None for the first page.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    if cursor is None:
+        return None
+    try:
+        last_date_posted, last_id = decode_cursor(cursor)
+        return date.fromisoformat(last_date_posted), int(last_id)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def jobs_page(request: Request, response: Response, jobs: List, limit: int, view: str):
+    """
+    Turns the rows read for a job listing page, one more than `limit`, into the page.
+
+    Sets the `X-Next-Cursor`, `ETag` and `Last-Modified` headers, answers a matching
+    `If-None-Match` with an empty 304, and serializes summaries (or every view with
+    `FAST_JSON_RESPONSES`) without response model validation.
+    """
+    headers = {}
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        last = jobs[-1]
+        headers["X-Next-Cursor"] = encode_cursor(
+            last.job_date_posted.isoformat(), last.job_id
+        )
+    page = [(job.job_id, job.job_version) for job in jobs]
+    page_version = hashlib.sha1(
+        repr((view, page, headers.get("X-Next-Cursor"))).encode()
+    ).hexdigest()
+    headers["ETag"] = f'"{page_version}"'
+    if jobs:
+        headers["Last-Modified"] = http_date(max(job.job_updated_at for job in jobs))
+    if is_not_modified(request.headers, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if view == "summary":
+        return FastJSONResponse(
+            [serialize_job_summary(job) for job in jobs], headers=headers
+        )
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse([serialize_job(job) for job in jobs], headers=headers)
+    response.headers.update(headers)
+    return jobs
+
+
+EXPORT_FIELDS = list(ShowJob.__fields__)
+
+
+async def _export_ndjson(jobs: AsyncIterator, batch_size: int) -> AsyncIterator[str]:
+    """
+    Serializes jobs as newline delimited JSON, one chunk per `batch_size` jobs.
+    """
+    lines = []
+    async for job in jobs:
+        lines.append(ShowJob.from_orm(job).json() + "\n")
+        if len(lines) >= batch_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
+
+
+async def _export_csv(jobs: AsyncIterator, batch_size: int) -> AsyncIterator[str]:
+    """
+    Serializes jobs as CSV with a header row, one chunk per `batch_size` jobs.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    rows = 0
+    async for job in jobs:
+        writer.writerow([getattr(job, field) for field in EXPORT_FIELDS])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue()
+
+
 @job_router.post(
     "/create/",
     summary="Create job",
@@ -25,10 +159,10 @@ job_router = APIRouter()
     description="Allows authorized users to create new job listings. Provide the job title, company name, location, and description.\
           The creation date is automatically set to the current date. This endpoint requires authentication.",
 )
-def create_job(
+async def create_job(
     job: JobCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
 ):
     """
     Internal API Documentation:
@@ -42,10 +176,121 @@ def create_job(
     Note: This function interacts with the database to create a new job record. Ensure proper session management and error handling for a seamless operation.
     """
     user_id = current_user.id
-    job = create_new_job(job=job, db=db, job_owner_id=user_id)
+    job = await create_new_job_async(job=job, db=db, job_owner_id=user_id)
     return job
 
 
+async def _read_bulk_items(request: Request) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yields the decoded items of a bulk request body with their index.
+
+    NDJSON bodies are decoded line by line as they arrive; other bodies must be a
+    JSON array. Lines that are not valid JSON are yielded as the ValueError raised.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index = 0
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _decode_line(line)
+                    index += 1
+        if pending.strip():
+            yield index, _decode_line(pending)
+        return
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a JSON array or an application/x-ndjson body.",
+        )
+    for index, item in enumerate(items):
+        yield index, item
+
+
+def _decode_line(line: bytes) -> object:
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        return error
+
+
+@job_router.post(
+    "/bulk/",
+    summary="Create jobs in bulk",
+    response_model=BulkJobResponse,
+    description="Allows authorized users to create many job listings in one request. \
+        The body is either a JSON array of jobs or newline delimited JSON with `Content-Type: application/x-ndjson`. \
+        Each item is validated on its own; the response lists the new job id or the validation errors of every item. \
+        This endpoint requires authentication.",
+)
+async def create_jobs_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: POST /bulk/
+    - Purpose: High volume ingestion of job listings, e.g. nightly partner feeds.
+    - Auth Required: Yes, every job is owned by the current user.
+    - Input: JSON array or NDJSON stream of `JobCreate` items, at most `BULK_MAX_ITEMS`.
+    - Output: `BulkJobResponse` with a `BulkJobResult` per item, in input order.
+
+    Items are validated and inserted in chunks of `BULK_CHUNK_SIZE`, one transaction
+    per chunk, so a failing chunk does not roll back the chunks before it. Reading
+    stops at the first item past the limit, which is reported as failed.
+    """
+    results: List[BulkJobResult] = []
+    chunk: List[Tuple[int, JobCreate]] = []
+
+    async def insert_chunk():
+        try:
+            job_ids = await create_new_jobs_async(
+                jobs=[job for _, job in chunk], db=db, job_owner_id=current_user.id
+            )
+        except SQLAlchemyError as error:
+            await db.rollback()
+            errors = [{"msg": f"Could not store job: {error.__class__.__name__}"}]
+            results.extend(
+                BulkJobResult(index=index, errors=errors) for index, _ in chunk
+            )
+        else:
+            results.extend(
+                BulkJobResult(index=index, job_id=job_id)
+                for (index, _), job_id in zip(chunk, job_ids)
+            )
+        chunk.clear()
+
+    async for index, item in _read_bulk_items(request):
+        if index >= settings.BULK_MAX_ITEMS:
+            errors = [{"msg": f"At most {settings.BULK_MAX_ITEMS} jobs per request"}]
+            results.append(BulkJobResult(index=index, errors=errors))
+            break
+        if isinstance(item, ValueError):
+            results.append(BulkJobResult(index=index, errors=[{"msg": "Invalid JSON"}]))
+            continue
+        try:
+            chunk.append((index, JobCreate.parse_obj(item)))
+        except ValidationError as error:
+            results.append(BulkJobResult(index=index, errors=error.errors()))
+            continue
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            await insert_chunk()
+    if chunk:
+        await insert_chunk()
+
+    results.sort(key=lambda result: result.index)
+    created = sum(1 for result in results if result.job_id is not None)
+    return BulkJobResponse(
+        created=created, failed=len(results) - created, results=results
+    )
+
+
 @job_router.get(
     "/get/{id}/",
     summary="Get job",
@@ -53,59 +298,228 @@ def create_job(
     description="Retrieves the details of a job by its unique identifier (ID).\
           This action requires no authentication and is available to all users.",
 )
-def read_job(id: int, db: Session = Depends(get_db)):
+async def read_job(
+    id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Internal API Documentation:
     - **Endpoint**: GET /get/{id}/
     - **Purpose**: Retrieve a specific job from the database using its ID.
     - **Auth Required**: No.
-    - **Input**: Job ID as path parameter.
-    - **Output**: `ShowJob` model instance of the job.
+    - **Input**: Job ID as path parameter, optional `If-None-Match`/`If-Modified-Since` headers.
+    - **Output**: `ShowJob` model instance of the job with `ETag` and `Last-Modified`
+      headers, or an empty 304 response if the client's copy is current.
+
+    The serialized job and its validators are kept in `job_cache`, so repeated reads
+    and conditional requests of a hot job are answered without a query. On a miss,
+    conditional requests are answered from the job's version columns alone, so a 304
+    costs one primary key lookup and no serialization.
 
     Raises:
         HTTPException: If the job with the specified ID does not exist.
     """
-    job = retreive_job(id=id, db=db)
+    conditional = (
+        "if-none-match" in request.headers or "if-modified-since" in request.headers
+    )
+    entry = await job_cache.get(id)
+    if entry is not None:
+        etag, job_updated_at, body = _unpack_job_entry(entry)
+        headers = {"ETag": etag, "Last-Modified": http_date(job_updated_at)}
+        if conditional and is_not_modified(request.headers, etag, job_updated_at):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    not_found = HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Job with this id {id} does not exist",
+    )
+    if conditional:
+        version = await get_job_version_async(id=id, db=db)
+        if version is None:
+            raise not_found
+        validators = _job_validators(id, *version)
+        if is_not_modified(request.headers, validators["ETag"], version.job_updated_at):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED, headers=validators
+            )
+    job = await retreive_job_async(id=id, db=db)
     if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Job with this id {id} does not exist",
-        )
-    return job
+        raise not_found
+    headers = _job_validators(job.job_id, job.job_version, job.job_updated_at)
+    if settings.FAST_JSON_RESPONSES:
+        body = dumps(serialize_job(job))
+    else:
+        body = ShowJob.from_orm(job).json().encode()
+    await job_cache.set(id, _pack_job_entry(headers["ETag"], job.job_updated_at, body))
+    return Response(body, media_type="application/json", headers=headers)
 
 
 @job_router.get(
     "/all/",
     summary="Get all jobs",
     response_model=List[ShowJob],
-    description="Fetches a list of all job listings. \
+    description="Fetches a page of active job listings, newest first. \
+        Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page. \
+        Use `view=summary` to leave out the job descriptions. \
         This endpoint does not require authentication\
               and is open to all users.",
 )
-def read_jobs(db: Session = Depends(get_db)):
+async def read_jobs(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.JOBS_PAGE_SIZE, ge=1, le=settings.JOBS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    location: Optional[str] = None,
+    company: Optional[str] = None,
+    posted_after: Optional[date] = None,
+    view: str = Query("full", regex="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Internal API Documentation:
     - Endpoint: GET /all/
-    - Purpose: Retrieve all job listings from the database.
+    - Purpose: Retrieve a page of job listings from the database.
     - Auth Required: No.
-    - Output: A list of `ShowJob` model instances.
+    - Input: Optional `limit`, `cursor`, `location`, `company`, `posted_after` and `view`
+      query parameters.
+    - Output: A list of `ShowJob` model instances, or of `JobSummary` without the
+      description with `view=summary`. When more jobs are available the
+      `X-Next-Cursor` header holds the cursor of the next page. The `ETag` of the page
+      changes when any job on it does; a matching `If-None-Match` gets an empty 304.
 
-    This function queries the database for all job records and returns them.
+    Pages are read with a keyset range scan on (job_date_posted, job_id), so the cost of
+    a page does not depend on how deep into the listing it is. With `FAST_JSON_RESPONSES`
+    the rows are serialized by `serialize_job` instead of being validated as `ShowJob`.
+    Only the columns of the requested view are read, and summaries are always serialized
+    by `serialize_job_summary`.
     """
-    jobs = list_jobs(db=db)
+    jobs = await list_jobs_async(
+        db=db,
+        limit=limit + 1,
+        after=decode_jobs_cursor(cursor),
+        location=location,
+        company=company,
+        posted_after=posted_after,
+        summary=view == "summary",
+    )
+    return jobs_page(request, response, jobs, limit, view)
+
+
+@job_router.get(
+    "/mine/",
+    summary="Get my jobs",
+    response_model=List[ShowJob],
+    description="Fetches a page of the active job listings of the current user, newest first. \
+        Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page. \
+        This endpoint requires authentication.",
+)
+async def read_my_jobs(
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.JOBS_PAGE_SIZE, ge=1, le=settings.JOBS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", regex="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: GET /mine/
+    - Purpose: Let employers list their own postings.
+    - Auth Required: Yes, lists the jobs owned by the current user.
+    - Input: Optional `limit`, `cursor` and `view` query parameters.
+    - Output: A page of `ShowJob` (or `JobSummary`) like GET /all/.
+
+    Pages are a keyset range scan of the (job_owner_id, job_is_active, job_date_posted)
+    index, so only the owner's jobs are read.
+    """
+    jobs = await list_jobs_async(
+        db=db,
+        limit=limit + 1,
+        after=decode_jobs_cursor(cursor),
+        owner_id=current_user.id,
+        summary=view == "summary",
+    )
+    return jobs_page(request, response, jobs, limit, view)
+
+
+@job_router.get(
+    "/search/",
+    summary="Search jobs",
+    response_model=List[ShowJob],
+    description="Full-text search over the title, company and description of active job listings. \
+        Results are ranked by relevance. This endpoint does not require authentication.",
+)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(settings.JOBS_PAGE_SIZE, ge=1, le=settings.JOBS_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=settings.SEARCH_MAX_OFFSET),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: GET /search/
+    - Purpose: Ranked full-text search of job listings.
+    - Auth Required: No.
+    - Input: `q` search text, optional `limit` and `offset` query parameters.
+    - Output: A list of `ShowJob` model instances, best match first.
+
+    Matching and ranking happen inside the database text index, so only the requested
+    page of results is read.
+    """
+    jobs = await search_jobs_async(query=q, db=db, limit=limit, offset=offset)
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse([serialize_job(job) for job in jobs])
     return jobs
 
 
+@job_router.get(
+    "/export/",
+    summary="Export all jobs",
+    description="Streams every active job listing as newline delimited JSON or CSV. \
+        The response is sent as it is read from the database, so it starts immediately \
+        and its size is not limited by server memory. This endpoint does not require authentication.",
+)
+async def export_jobs(
+    export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: GET /export/
+    - Purpose: Bulk export of all active job listings, e.g. for search indexing.
+    - Auth Required: No.
+    - Input: Optional `format` query parameter, either `ndjson` (default) or `csv`.
+    - Output: A streamed body with one job per line, ordered by job_id.
+
+    Jobs are read with a server-side cursor in batches of `EXPORT_BATCH_SIZE` rows and
+    each batch is written out before the next one is fetched.
+    """
+    batch_size = settings.EXPORT_BATCH_SIZE
+    jobs = stream_jobs_async(db=db, batch_size=batch_size)
+    if export_format == "csv":
+        return StreamingResponse(
+            _export_csv(jobs, batch_size),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="jobs.csv"'},
+        )
+    return StreamingResponse(
+        _export_ndjson(jobs, batch_size), media_type="application/x-ndjson"
+    )
+
+
 @job_router.put(
     "/update/{id}/",
     summary="Update job",
     description="Updates an existing job listing with new details. This endpoint requires the user to be authenticated and authorized to update the job listing.",
 )
-def update_job(
+async def update_job(
     id: int,
     job: JobCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
 ):
     """
     Internal API Documentation:
@@ -115,18 +529,22 @@ def update_job(
     - Input: Job ID as path parameter and `JobCreate` model with new job details.
     - Output: Confirmation message of successful update.
 
-    Checks for the existence of the job, verifies ownership or superuser status, then updates the job in the database.
+    The ownership check is part of the UPDATE statement itself; the job is only looked
+    up again when nothing was updated, to tell a missing job from a forbidden one.
     """
-    job_owner_id = current_user.id
-    job_retrieved = retreive_job(id=id, db=db)
-    if not job_retrieved:
+    outcome = await update_job_by_id_async(
+        id=id,
+        job=job,
+        db=db,
+        job_owner_id=current_user.id,
+        is_superuser=current_user.is_superuser,
+    )
+    if outcome == JOB_NOT_FOUND:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Job with id {id} does not exist",
         )
-    if job_retrieved.job_owner_id == current_user.id or current_user.is_superuser:
-        update_job_by_id(id=id, job=job, db=db, job_owner_id=job_owner_id)
-    else:
+    if outcome == JOB_FORBIDDEN:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="You are not authorized to update.",
@@ -139,10 +557,10 @@ def update_job(
     summary="Delete job",
     description="Deletes a job listing by its ID. This action requires the user to be either the owner of the job listing or a superuser.",
 )
-def delete_job(
+async def delete_job(
     id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_from_token),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
 ):
     """
     Internal API Documentation:
@@ -151,20 +569,22 @@ def delete_job(
     - Auth Required: Yes, requires ownership or superuser status.
     - Input: Job ID as path parameter.
 
-    Verifies job existence and ownership/superuser status before deleting the job from the database.
+    The ownership check is part of the DELETE statement itself; the job is only looked
+    up again when nothing was deleted, to tell a missing job from a forbidden one.
     """
-
-    job = retreive_job(id=id, db=db)
-    if not job:
-        return HTTPException(
+    outcome = await delete_job_by_id_async(
+        id=id,
+        db=db,
+        job_owner_id=current_user.id,
+        is_superuser=current_user.is_superuser,
+    )
+    if outcome == JOB_NOT_FOUND:
+        raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Job with {id} does not exist",
         )
-
-    if job.job_owner_id == current_user.id or current_user.is_superuser:
-        delete_job_by_id(id=id, db=db, job_owner_id=current_user.id)
-        return {"msg": "Job successfully deleted."}
-
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not permitted !"
-    )
+    if outcome == JOB_FORBIDDEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not permitted !"
+        )
+    return {"msg": "Job successfully deleted."}
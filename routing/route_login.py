@@ -1,44 +1,166 @@
 from datetime import timedelta
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
-from core.security import authenticate_user, create_access_token
-from db.session import get_db
+from core.hashing import HasherBusy
+from core.ratelimit import RateLimited
+from core.security import (
+    REFRESH_TOKEN_TYPE,
+    access_token_claims,
+    authenticate_user_async,
+    create_access_token,
+    create_refresh_token,
+    login_limiter,
+    reuseable_oauth,
+    revoke_token_claims_async,
+    verify_token,
+)
+from db.models.users import User
+from db.operations.users import get_user_by_email_async
+from db.session import get_async_db
+from schemas.tokens import LogoutRequest, RefreshRequest, Token
 
 login_router = APIRouter()
 
 
-@login_router.post("/token", summary="Login user")
-def login_for_access_token(
+def _issue_tokens(user: User, response: Response) -> dict:
+    access_token_expire = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data=access_token_claims(user), expires_delta=access_token_expire
+    )
+    refresh_token = create_refresh_token(data={"sub": user.email})
+    response.set_cookie(
+        key="access_token", value=f"Bearer {access_token}", httponly=True
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+    }
+
+
+@login_router.post("/token", summary="Login user", response_model=Token)
+async def login_for_access_token(
+    request: Request,
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     A function to handle user login and generate an access token.
 
     Parameters:
+    - request: FastAPI Request object, giving the client IP
     - response: FastAPI Response object
     - form_data: OAuth2PasswordRequestForm object containing username and password
-    - db: SQLAlchemy Session object
+    - db: SQLAlchemy AsyncSession object
 
     Returns:
-    A dictionary containing the generated access token and its type.
+    A dictionary containing the generated access and refresh tokens and the token type.
+
+    Attempts are first rate limited by client IP and by username; past the limits
+    they are refused with 429 and a Retry-After header before any lookup or hashing.
+    The password check runs on the bounded hashing pool; when it is saturated the
+    login is refused with 503 and a Retry-After header instead of queueing.
     """
-    user = authenticate_user(form_data.username, form_data.password, db)
+    try:
+        await login_limiter.check(
+            ip=request.client.host if request.client else None,
+            username=form_data.username.strip().lower(),
+        )
+    except RateLimited as limited:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, retry later.",
+            headers={"Retry-After": str(limited.retry_after)},
+        )
+    try:
+        user = await authenticate_user_async(form_data.username, form_data.password, db)
+    except HasherBusy as busy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, retry later.",
+            headers={"Retry-After": str(busy.retry_after)},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
         )
-    access_token_expire = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expire
-    )
-    response.set_cookie(
-        key="access_token", value=f"Bearer {access_token}", httponly=True
+    return _issue_tokens(user, response)
+
+
+@login_router.post("/refresh", summary="Refresh tokens", response_model=Token)
+async def refresh_access_token(
+    body: RefreshRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: POST /refresh
+    - Purpose: Trade a refresh token for a new access token once the short-lived
+      access token expired.
+    - Auth Required: No, the refresh token is the credential.
+    - Input: `RefreshRequest` with the refresh token returned by the login.
+    - Output: `Token` with a new access token and a new refresh token.
+
+    Refresh tokens are single use: the presented one is revoked before new tokens are
+    issued, and the revocation is the atomic gate, so a replayed token, or the loser
+    of concurrent refreshes with one token, gets 401. The user is read again, so the
+    new access token carries its current claims.
+    """
+    invalid_refresh_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    claims = verify_token(body.refresh_token)
+    if (
+        claims is None
+        or claims.get("typ") != REFRESH_TOKEN_TYPE
+        or not await revoke_token_claims_async(claims, db)
+    ):
+        raise invalid_refresh_token_exception
+    user = await get_user_by_email_async(email=claims["sub"], db=db)
+    if user is None or not user.is_active:
+        raise invalid_refresh_token_exception
+    return _issue_tokens(user, response)
+
+
+@login_router.post("/logout", summary="Logout user")
+async def logout(
+    response: Response,
+    body: Optional[LogoutRequest] = None,
+    token: str = Depends(reuseable_oauth),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Internal API Documentation:
+    - Endpoint: POST /logout
+    - Purpose: End a session before its tokens expire.
+    - Auth Required: Yes, the access token to revoke.
+    - Input: Optionally a `LogoutRequest` with the refresh token of the session.
+    - Output: Confirmation message of the logout.
+
+    Revoked tokens are refused by every worker within `REVOCATION_SYNC_INTERVAL`
+    seconds, and at once by the worker handling the logout.
+    """
+    claims = verify_token(token)
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await revoke_token_claims_async(claims, db)
+    if body is not None and body.refresh_token:
+        refresh_claims = verify_token(body.refresh_token)
+        if refresh_claims is not None and refresh_claims["sub"] == claims.get("sub"):
+            await revoke_token_claims_async(refresh_claims, db)
+    response.delete_cookie("access_token")
+    return {"msg": "Successfully logged out."}
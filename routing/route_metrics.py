@@ -0,0 +1,108 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import HISTOGRAMS, render_gauges
+from core.security import login_limiter, token_cache, user_cache
+from db.operations.jobs import job_cache
+from db.session import pool_stats
+
+metrics_router = APIRouter()
+
+
+def cache_stats():
+    return {
+        "jobs": job_cache.stats(),
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+    }
+
+
+@metrics_router.get(
+    "/pool",
+    summary="Connection pool metrics",
+    description="Returns the size, occupancy and checkout wait counters of the database connection pools.",
+)
+async def read_pool_metrics():
+    """
+    Internal API Documentation:
+    - Endpoint: GET /pool
+    - Purpose: Expose connection pool occupancy and checkout wait times for pool sizing.
+    - Auth Required: No.
+    - Output: A dictionary with the stats of the `sync` and `async` pools.
+    """
+    return pool_stats()
+
+
+@metrics_router.get(
+    "/cache",
+    summary="Cache metrics",
+    description="Returns the hit and miss counters of the job, user and verified token caches.",
+)
+async def read_cache_metrics():
+    """
+    Internal API Documentation:
+    - Endpoint: GET /cache
+    - Purpose: Expose cache hit ratios to tune cache sizes and time to live.
+    - Auth Required: No.
+    - Output: A dictionary with the stats of the `jobs`, `users` and `tokens` caches.
+    """
+    return cache_stats()
+
+
+@metrics_router.get(
+    "/ratelimit",
+    summary="Rate limit metrics",
+    description="Returns the number of logins allowed and refused by the login rate limits.",
+)
+async def read_rate_limit_metrics():
+    """
+    Internal API Documentation:
+    - Endpoint: GET /ratelimit
+    - Purpose: Expose how many login attempts the rate limits refused; each one is a
+      user lookup and a bcrypt verification saved.
+    - Auth Required: No.
+    - Output: A dictionary with the counters of the `login` limiter.
+    """
+    return {"login": login_limiter.stats()}
+
+
+@metrics_router.get(
+    "",
+    summary="Prometheus metrics",
+    description="Returns request latency, query count and database time histograms, and pool and cache gauges, in the Prometheus text format.",
+    response_class=PlainTextResponse,
+)
+async def read_prometheus_metrics():
+    """
+    Internal API Documentation:
+    - Endpoint: GET /metrics
+    - Purpose: Scrape target for Prometheus; histograms are labelled by route template.
+    - Auth Required: No.
+    - Output: The Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    pools = {
+        f"{pool}_{key}": value
+        for pool, stats in pool_stats().items()
+        for key, value in stats.items()
+        if isinstance(value, (int, float))
+    }
+    lines.extend(render_gauges("db_pool", "Database connection pool stats.", pools))
+    caches = {
+        f"{cache}_{key}": value
+        for cache, stats in cache_stats().items()
+        for key, value in stats.items()
+    }
+    lines.extend(render_gauges("cache", "Job, user and token cache stats.", caches))
+    lines.extend(
+        render_gauges(
+            "login_rate_limit",
+            "Logins allowed and refused by the login rate limits.",
+            login_limiter.stats(),
+        )
+    )
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4"
+    )
@@ -1,11 +1,25 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.operations.users import create_new_user, list_users
-from db.session import get_db
-from schemas.users import ShowUser, UserCreate
+from core.config import settings
+from core.hashing import Hasher, HasherBusy
+from core.pagination import decode_cursor, encode_cursor
+from core.security import UserSnapshot, get_current_user_from_token
+from core.serialization import FastJSONResponse
+from db.operations.jobs import list_jobs_async
+from db.operations.users import (
+    create_new_user_async,
+    estimate_user_count_async,
+    get_user_by_email_async,
+    list_users_async,
+)
+from db.session import get_async_db
+from routing.route_jobs import decode_jobs_cursor, jobs_page
+from schemas.jobs import ShowJob
+from schemas.users import ShowUser, UserCreate, serialize_user
 
 users_router = APIRouter()
 
@@ -14,21 +28,55 @@ users_router = APIRouter()
     "/",
     summary="Get all users",
     response_model=List[ShowUser],
-    description="Retrieves a list of all users registered in the system.\
+    description="Retrieves a page of the users registered in the system, in registration order. \
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page, and `q` to \
+    only list users whose username or email starts with it. \
     This endpoint may require authentication and authorization depending on your application's security requirements.",
 )
-def read_users(db: Session = Depends(get_db)):
+async def read_users(
+    response: Response,
+    limit: int = Query(settings.USERS_PAGE_SIZE, ge=1, le=settings.USERS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    db: AsyncSession = Depends(get_async_db),
+):
     """
     Internal API Documentation:
     - **Endpoint**: GET /
-    - **Purpose**: Fetch all registered users from the database.
+    - **Purpose**: Fetch a page of the registered users from the database.
     - **Auth Required**: Depends on application's security settings.
-    - **Output**: A list of `ShowUser` model instances representing the users.
+    - **Input**: Optional `limit`, `cursor` and `q` (username or email prefix) query parameters.
+    - **Output**: A list of `ShowUser` model instances representing the users. When more
+      users are available the `X-Next-Cursor` header holds the cursor of the next page.
+      The first page carries an `X-Total-Count-Estimate` header with the approximate
+      number of users, read from table statistics rather than counted.
 
-    This function queries the database for all user records and returns them.\
+    Pages are read with a keyset range scan on the user id, and prefix searches with a
+    range scan of the username and email indexes.\
     Ensure proper handling of user data in compliance with privacy regulations.
     """
-    users = list_users(db=db)
+    after = None
+    if cursor is not None:
+        try:
+            (last_id,) = decode_cursor(cursor)
+            after = int(last_id)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+    users = await list_users_async(db=db, limit=limit + 1, after=after, prefix=q)
+    headers = {}
+    if len(users) > limit:
+        users = users[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(users[-1].id)
+    if cursor is None and q is None:
+        headers["X-Total-Count-Estimate"] = str(await estimate_user_count_async(db))
+    if settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(
+            [serialize_user(user) for user in users], headers=headers
+        )
+    response.headers.update(headers)
     return users
 
 
@@ -38,7 +86,7 @@ def read_users(db: Session = Depends(get_db)):
     response_model=ShowUser,
     description="Registers a new user with the provided details. This is the entry point for new users to create an account in the system.",
 )
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Internal API Documentation:
     - **Endpoint**: POST /register/
@@ -50,6 +98,73 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
     Ensures that the provided user details are valid and checks for any potential conflicts,\
     such as duplicate usernames or emails, before creating the user record in the database\
     . Implement appropriate error handling for such cases.
+
+    Emails already registered are refused with 400 before the password is hashed,
+    looked up without the miss cache of logins; a username or email taken concurrently is
+    refused by the unique constraints. The password is hashed on the bounded
+    hashing pool; when it is saturated the registration is refused with 503 and a
+    Retry-After header instead of queueing.
     """
-    user = create_new_user(user=user, db=db)
+    duplicate_user_exception = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="A user with this username or email already exists.",
+    )
+    if await get_user_by_email_async(email=user.email, db=db) is not None:
+        raise duplicate_user_exception
+    try:
+        hashed_password = await Hasher.get_password_hash_async(user.password)
+    except HasherBusy as busy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many registrations in progress, retry later.",
+            headers={"Retry-After": str(busy.retry_after)},
+        )
+    try:
+        user = await create_new_user_async(
+            user=user, db=db, hashed_password=hashed_password
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise duplicate_user_exception
     return user
+
+
+@users_router.get(
+    "/{id}/jobs/",
+    summary="Get the jobs of a user",
+    response_model=List[ShowJob],
+    description="Fetches a page of the active job listings of a user, newest first. \
+        Pass the `X-Next-Cursor` response header back as `cursor` to fetch the next page. \
+        This endpoint is restricted to superusers.",
+)
+async def read_user_jobs(
+    id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(settings.JOBS_PAGE_SIZE, ge=1, le=settings.JOBS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: str = Query("full", regex="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_user_from_token),
+):
+    """
+    Internal API Documentation:
+    - **Endpoint**: GET /{id}/jobs/
+    - **Purpose**: Let administrators review the postings of any employer.
+    - **Auth Required**: Yes, superuser status.
+    - **Input**: User ID as path parameter, optional `limit`, `cursor` and `view` query parameters.
+    - **Output**: A page of `ShowJob` (or `JobSummary`) like GET /jobs/mine/, empty
+      for unknown users.
+    """
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="You are not permitted !"
+        )
+    jobs = await list_jobs_async(
+        db=db,
+        limit=limit + 1,
+        after=decode_jobs_cursor(cursor),
+        owner_id=id,
+        summary=view == "summary",
+    )
+    return jobs_page(request, response, jobs, limit, view)
@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import Dict, Optional
 
 from fastapi import HTTPException, Request, status
@@ -58,3 +60,43 @@ class OAuth2PasswordBearerWithCookie(OAuth2):
             else:
                 return None
         return
+
+
+def http_date(value: datetime) -> str:
+    """
+    Formats a naive UTC datetime as an HTTP date, e.g. for a Last-Modified header.
+    """
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def is_not_modified(
+    headers, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    Evaluates the If-None-Match and If-Modified-Since headers of a request against
+    the current validators of a resource, following RFC 7232: If-Modified-Since is
+    ignored when If-None-Match is present.
+
+    Parameters:
+        headers: The request headers.
+        etag (str): The current strong ETag of the resource, including its quotes.
+        last_modified (Optional[datetime]): The naive UTC time of the last change.
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return modified <= since
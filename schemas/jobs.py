@@ -1,7 +1,9 @@
-from datetime import date, datetime
-from typing import Optional
+from datetime import date
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
+
+from core.serialization import compile_serializer
 
 
 class JobBase(BaseModel):
@@ -10,7 +12,12 @@ class JobBase(BaseModel):
     job_company_url: Optional[str] = None
     job_location: Optional[str] = "Remote"
     job_description: Optional[str] = None
-    job_date_posted: Optional[date] = datetime.now().date()
+    job_date_posted: Optional[date] = None
+
+    @validator("job_date_posted", always=True)
+    def default_date_posted(cls, value: Optional[date]) -> date:
+        # Jobs are keyset paginated and archived by date, they always have one.
+        return value or date.today()
 
 
 class JobCreate(JobBase):
@@ -31,3 +38,31 @@ class ShowJob(JobBase):
 
     class Config:
         orm_mode = True
+
+
+class JobSummary(BaseModel):
+    job_id: int
+    job_title: str
+    job_company: str
+    job_company_url: Optional[str]
+    job_location: str
+    job_date_posted: date
+
+    class Config:
+        orm_mode = True
+
+
+serialize_job = compile_serializer(ShowJob)
+serialize_job_summary = compile_serializer(JobSummary)
+
+
+class BulkJobResult(BaseModel):
+    index: int
+    job_id: Optional[int] = None
+    errors: Optional[List[Dict[str, Any]]] = None
+
+
+class BulkJobResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkJobResult]
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, EmailStr
 
+from core.serialization import compile_serializer
+
 
 class UserCreate(BaseModel):
     username: str
@@ -14,3 +16,6 @@ class ShowUser(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+serialize_user = compile_serializer(ShowUser)
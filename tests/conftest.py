@@ -1,16 +1,29 @@
+import asyncio
 import os
 import sys
+from contextlib import contextmanager
 from typing import Any, Generator
 
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
+# Keep password hashing cheap in tests; must be set before the settings are imported.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Tests counting statements must not see a periodic revocation sync; tests needing
+# one reset `revocation_index`, which syncs on the next check.
+os.environ["REVOCATION_SYNC_INTERVAL"] = "3600"
+
 from core.config import settings
+from core.metrics import TimingMiddleware
+from core.security import login_limiter, revocation_index, token_cache, user_cache
 from db.base import Base
-from db.session import get_db
+from db.operations.jobs import job_cache
+from db.operations.users import user_miss_cache
+from db.session import get_async_db, get_db, instrument_engine
 from routing.base import api_router
 from tests.utils import authentication_token_from_email
 
@@ -22,6 +35,12 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 SessionTesting = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+AsyncSessionTesting = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
 
 
 def start_application():
@@ -29,6 +48,7 @@ def start_application():
     Function to start the application and return a FastAPI instance.
     """
     app = FastAPI()
+    app.add_middleware(TimingMiddleware)
     app.include_router(api_router)
     return app
 
@@ -42,6 +62,12 @@ def app() -> Generator[FastAPI, Any, None]:
     _app = start_application()
     yield _app
     Base.metadata.drop_all(engine)
+    user_cache.clear()
+    user_miss_cache.clear()
+    token_cache.clear()
+    revocation_index.clear()
+    asyncio.run(login_limiter.clear())
+    asyncio.run(job_cache.clear())
 
 
 @pytest.fixture(scope="module")
@@ -49,19 +75,18 @@ def db_session(app: FastAPI) -> Generator[SessionTesting, Any, None]:
     """
     Fixture function that returns a database session for testing purposes.
 
+    The routes use their own asyncio sessions, so data written here is committed
+    for them to see; the tables are dropped by the `app` fixture afterwards.
+
     Args:
         app (FastAPI): The FastAPI application instance.
 
     Yields:
         Generator[SessionTesting, Any, None]: A generator that yields a testing session for database operations.
     """
-    connection = engine.connect()
-    transaction = connection.begin()
-    session = SessionTesting(bind=connection)
+    session = SessionTesting()
     yield session
     session.close()
-    transaction.rollback()
-    connection.close()
 
 
 @pytest.fixture(scope="module", name="client")
@@ -70,7 +95,8 @@ def client(
 ) -> Generator[TestClient, Any, None]:
     """
     Create a new FastAPI TestClient that uses the `db_session` fixture to override
-    the `get_db` dependency that is injected into routes.
+    the `get_db` dependency, and sessions on the test database to override the
+    `get_async_db` dependency, that are injected into routes.
     """
 
     def _get_test_db():
@@ -79,7 +105,12 @@ def client(
         finally:
             pass
 
+    async def _get_test_async_db():
+        async with AsyncSessionTesting() as session:
+            yield session
+
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_async_db] = _get_test_async_db
     with TestClient(app) as client:
         yield client
 
@@ -99,3 +130,27 @@ def normal_user_token_headers(client: TestClient, db_session: Session):
     return authentication_token_from_email(
         client=client, email=settings.TEST_USER_EMAIL, db=db_session
     )
+
+
+@pytest.fixture
+def count_statements():
+    """
+    Fixture returning a context manager that collects the SQL statements the routes
+    send to the test database while it is open.
+    """
+
+    @contextmanager
+    def _count_statements():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        sync_engine = async_engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    return _count_statements
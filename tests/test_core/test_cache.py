@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from core.cache import CacheBackend, MemoryCacheBackend, TTLCache, build_cache_backend
+from core.ratelimit import MemoryRateLimitBackend, build_rate_limit_backend
+
+
+def test_cache_evicts_least_recently_used():
+    """
+    Test that a full cache evicts the entry that was used least recently.
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 3, "misses": 1}
+
+
+def test_cache_expires_entries():
+    """
+    Test that entries are no longer returned once their time to live has passed.
+    """
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    cache.set("b", 2)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    cache.pop("b")
+    assert cache.get("b") is None
+
+
+def test_build_backends_from_settings():
+    """
+    Test that the cache and rate limit backends are selected by the same setting
+    values, and that a backend missing methods of its interface cannot be built.
+    """
+    assert build_cache_backend("none", maxsize=1, ttl=1, prefix="") is None
+    assert build_rate_limit_backend("none", maxsize=1, prefix="") is None
+    cache = build_cache_backend("memory", maxsize=1, ttl=1, prefix="")
+    assert isinstance(cache, MemoryCacheBackend)
+    limiter = build_rate_limit_backend("memory", maxsize=1, prefix="")
+    assert isinstance(limiter, MemoryRateLimitBackend)
+
+    class IncompleteBackend(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        IncompleteBackend()
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from core.ratelimit import MemoryRateLimitBackend, RateLimited, RateLimiter
+
+
+def test_rate_limiter_token_buckets():
+    """
+    Test that each dimension allows its burst, then refuses until the bucket refills,
+    and that a refused dimension does not consume the tokens of the next ones.
+    """
+    limiter = RateLimiter(
+        MemoryRateLimitBackend(maxsize=10),
+        limits={"ip": (2, 60), "username": (1, 60)},
+    )
+
+    async def attempts():
+        await limiter.check(ip="1.2.3.4", username="a")
+        with pytest.raises(RateLimited) as limited:
+            await limiter.check(ip="1.2.3.4", username="a")
+        assert limited.value.retry_after == 1
+        with pytest.raises(RateLimited):
+            await limiter.check(ip="1.2.3.4", username="b")
+        await limiter.check(ip="5.6.7.8", username="b")
+        await asyncio.sleep(1.05)
+        await limiter.check(ip="1.2.3.4", username="a")
+
+    asyncio.run(attempts())
+    assert limiter.stats() == {
+        "allowed": 3,
+        "limited_by_ip": 1,
+        "limited_by_username": 1,
+    }
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from datetime import timedelta
+
+from jose import jwt
+
+from core import hashing
+from core.config import settings
+from core.hashing import Hasher, HasherBusy, dummy_password_hash
+from core.revocation import BloomFilter
+from core.security import (
+    UserSnapshot,
+    create_access_token,
+    token_cache,
+    user_cache,
+    verify_token,
+)
+from db.models.users import User
+
+
+def test_verify_token_with_rotated_keys(monkeypatch):
+    """
+    Test that tokens name their signing key, stay valid after the active key is
+    rotated while their key is still configured, and that tokens signed with an
+    unknown key, tampered with, or made before rotation support are handled.
+    """
+    monkeypatch.setattr(settings, "JWT_SIGNING_KEYS", {"old": "s3cret", "new": "n3w"})
+    monkeypatch.setattr(settings, "JWT_ACTIVE_KEY_ID", "old")
+    token_cache.clear()
+    old_token = create_access_token({"sub": "a@b.com"}, timedelta(minutes=5))
+    assert jwt.get_unverified_header(old_token)["kid"] == "old"
+
+    monkeypatch.setattr(settings, "JWT_ACTIVE_KEY_ID", "new")
+    new_token = create_access_token({"sub": "a@b.com"}, timedelta(minutes=5))
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert verify_token(old_token)["sub"] == "a@b.com"
+    assert verify_token(new_token)["sub"] == "a@b.com"
+    assert verify_token(old_token)["sub"] == "a@b.com"
+    assert token_cache.stats()["hits"] == 1
+
+    assert verify_token(old_token[:-2]) is None
+    unknown = jwt.encode(
+        {"sub": "a@b.com", "exp": 2**40}, "s3cret", headers={"kid": "gone"}
+    )
+    assert verify_token(unknown) is None
+    legacy = jwt.encode({"sub": "a@b.com", "exp": 2**40}, settings.SECRET_KEY)
+    assert verify_token(legacy)["sub"] == "a@b.com"
+    expired = create_access_token({"sub": "a@b.com"}, timedelta(seconds=-1))
+    assert verify_token(expired) is None
+    token_cache.clear()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """
+    Test that every added key is found and that the false positive rate stays near
+    the configured one.
+    """
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for index in range(1000):
+        bloom.add(f"revoked-{index}")
+    assert all(f"revoked-{index}" in bloom for index in range(1000))
+    false_positives = sum(f"valid-{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+
+
+def test_dummy_password_hash_made_on_hashing_pool(monkeypatch):
+    """
+    Test that the dummy hash of unknown-account logins is made once, on the hashing
+    pool rather than on the event loop.
+    """
+    threads = []
+    context = hashing.password_context()
+
+    class RecordingContext:
+        def hash(self, secret):
+            threads.append(threading.current_thread().name)
+            return context.hash(secret)
+
+    monkeypatch.setattr(hashing, "password_context", RecordingContext)
+    dummy_password_hash.cache_clear()
+    first = asyncio.run(Hasher.dummy_password_hash_async())
+    assert asyncio.run(Hasher.dummy_password_hash_async()) == first
+    assert len(threads) == 1 and threads[0].startswith("hasher")
+    dummy_password_hash.cache_clear()
+
+
+def test_user_cache_invalidated_on_commit(db_session):
+    """
+    Test that a modified user is dropped from the user cache when the change
+    commits, not when it is flushed, and not at all when it is rolled back.
+    """
+    user = User(
+        username="cacheduser",
+        email="cacheduser@nofoobar.com",
+        hashed_password="x",
+        is_active=True,
+        is_superuser=False,
+    )
+    db_session.add(user)
+    db_session.commit()
+    snapshot = UserSnapshot(user.id, user.email, True, False)
+
+    user_cache.set(user.email, snapshot)
+    user.is_active = False
+    db_session.flush()
+    assert user_cache.get(user.email) == snapshot
+    db_session.rollback()
+    assert user_cache.get(user.email) == snapshot
+
+    user.is_active = False
+    db_session.flush()
+    db_session.commit()
+    assert user_cache.get(user.email) is None
+
+
+def test_hasher_slot_held_until_cancelled_job_finishes(monkeypatch):
+    """
+    Test that cancelling a caller waiting on the hashing pool keeps the slot of its
+    job taken until the job has finished running.
+    """
+    monkeypatch.setattr(Hasher, "_slots", threading.BoundedSemaphore(1))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+
+    async def cancel_while_running():
+        task = asyncio.ensure_future(Hasher._run(slow_hash))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        try:
+            await Hasher._run(len, "")
+        except HasherBusy:
+            return True
+        return False
+
+    assert asyncio.run(cancel_while_running())
+    release.set()
+    assert Hasher._slots.acquire(timeout=5)
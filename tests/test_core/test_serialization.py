@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from core.serialization import FastJSONResponse, dumps
+from db.base import Job
+from schemas.jobs import ShowJob, serialize_job
+
+
+def test_serialize_job_matches_show_job():
+    """
+    Test that the compiled serializer renders the same JSON as validating the job
+    with `ShowJob` and encoding it the way FastAPI does.
+    """
+    job = Job(
+        job_id=7,
+        job_title="Développeur ✓",
+        job_company="doogle",
+        job_company_url=None,
+        job_location="Paris",
+        job_description="python",
+        job_date_posted=date(2022, 3, 20),
+        job_version=3,
+        job_updated_at=datetime(2022, 3, 21, 8, 30),
+    )
+    expected = JSONResponse(jsonable_encoder([ShowJob.from_orm(job)])).body
+    assert FastJSONResponse([serialize_job(job)]).body == expected
+    expected = JSONResponse(jsonable_encoder(ShowJob.from_orm(job))).body
+    assert dumps(serialize_job(job)) == expected
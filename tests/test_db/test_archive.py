@@ -0,0 +1,53 @@
+from datetime import date
+
+from db.archive import archive_jobs
+from db.base import Job, JobArchive
+
+
+def test_archive_expired_jobs(client, db_session, normal_user_token_headers):
+    """
+    Test that jobs posted before the cutoff are moved to the archive in batches,
+    disappear from the listing, and are still served by id.
+    """
+    data = {
+        "job_title": "SDE expired",
+        "job_company": "doogle",
+        "job_location": "Rome",
+        "job_description": "python",
+    }
+    expired_ids = []
+    for day in ("2000-01-01", "2000-01-02", "2000-01-03"):
+        response = client.post(
+            "/jobs/create/",
+            json={**data, "job_date_posted": day},
+            headers=normal_user_token_headers,
+        )
+        expired_ids.append(response.json()["job_id"])
+    response = client.post(
+        "/jobs/create/",
+        json={**data, "job_title": "SDE live", "job_date_posted": "2022-01-01"},
+        headers=normal_user_token_headers,
+    )
+    live_id = response.json()["job_id"]
+
+    assert archive_jobs(db_session, posted_before=date(2010, 1, 1), batch_size=2) == 3
+    assert archive_jobs(db_session, posted_before=date(2010, 1, 1), batch_size=2) == 0
+
+    response = client.get("/jobs/all/", params={"location": "Rome"})
+    assert [job["job_id"] for job in response.json()] == [live_id]
+    response = client.get(f"/jobs/get/{expired_ids[0]}/")
+    assert response.status_code == 200
+    assert response.json()["job_title"] == "SDE expired"
+    assert response.headers["ETag"] == f'"{expired_ids[0]}-1"'
+
+    archived = db_session.query(JobArchive).filter(JobArchive.job_id.in_(expired_ids))
+    assert sorted(job.job_id for job in archived) == expired_ids
+    assert not any(job.job_is_active for job in archived)
+    assert db_session.query(Job).filter(Job.job_id.in_(expired_ids)).count() == 0
+
+    response = client.post(
+        "/jobs/create/",
+        json={**data, "job_date_posted": "2022-01-02"},
+        headers=normal_user_token_headers,
+    )
+    assert response.json()["job_id"] not in expired_ids
@@ -0,0 +1,70 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from db.base import Base
+from db.migrate import alembic_config, run
+from db.schema import SCHEMA_VERSION, SchemaOutOfDate, check_schema, include_object
+
+
+@pytest.fixture
+def migration_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+
+
+def test_schema_version_is_the_latest_migration():
+    """
+    Test that the revision checked at startup is the head of the migration scripts.
+    """
+    script = ScriptDirectory.from_config(alembic_config())
+    assert script.get_current_head() == SCHEMA_VERSION
+
+
+def test_migrations_match_the_models(migration_engine):
+    """
+    Test that upgrading an empty database yields the schema of the models, with a
+    working full-text index, and that the startup check accepts it.
+    """
+    with pytest.raises(SchemaOutOfDate):
+        check_schema(migration_engine)
+    assert run("upgrade", "head", migration_engine) == SCHEMA_VERSION
+    check_schema(migration_engine)
+    with migration_engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"include_object": include_object}
+        )
+        assert compare_metadata(context, Base.metadata) == []
+        assert connection.execute(text("SELECT count(*) FROM job_fts")).scalar() == 0
+
+
+def test_migrations_upgrade_baseline_data(migration_engine):
+    """
+    Test that jobs stored under the baseline schema get validators and a posting
+    date and are indexed for search by the upgrade, and that the migrations downgrade cleanly.
+    """
+    run("upgrade", "0001", migration_engine)
+    with migration_engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO job (job_title, job_company, job_location, job_description)"
+                " VALUES ('SDE', 'doogle', 'Remote', 'python')"
+            )
+        )
+    run("upgrade", "head", migration_engine)
+    with migration_engine.connect() as connection:
+        version, date_posted = connection.execute(
+            text("SELECT job_version, job_date_posted FROM job")
+        ).one()
+        assert version == 1
+        assert date_posted is not None
+        matches = connection.execute(
+            text("SELECT count(*) FROM job_fts WHERE job_fts MATCH 'python'")
+        ).scalar()
+        assert matches == 1
+    run("downgrade", "base", migration_engine)
+    tables = inspect(migration_engine).get_table_names()
+    assert [table for table in tables if not table.startswith("sqlite_")] == [
+        "alembic_version"
+    ]
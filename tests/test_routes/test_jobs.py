@@ -1,4 +1,14 @@
+import csv
+import io
+import json
+from datetime import date
+
 from fastapi import status
+from sqlalchemy.dialects.sqlite.aiosqlite import AsyncAdapt_aiosqlite_ss_cursor
+
+from core.config import settings
+from db.base import Job, User
+from tests.utils import authentication_token_from_email
 
 
 def test_read_main(client):
@@ -88,6 +98,273 @@ def test_read_all_jobs(client, normal_user_token_headers):
     assert response.json()[1]
 
 
+def test_read_jobs_paginated(client, normal_user_token_headers):
+    """
+    Test that the job listing is paginated newest first and that following the
+    `X-Next-Cursor` header walks the remaining jobs without duplicates.
+    """
+    for day in ("2023-01-01", "2023-01-03", "2023-01-02"):
+        data = {
+            "job_title": "SDE paged",
+            "job_company": "doogle",
+            "job_company_url": "www.doogle.com",
+            "job_location": "Berlin",
+            "job_description": "python",
+            "job_date_posted": day,
+        }
+        client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+
+    response = client.get("/jobs/all/", params={"location": "Berlin", "limit": 2})
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [job["job_date_posted"] for job in first_page] == [
+        "2023-01-03",
+        "2023-01-02",
+    ]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        "/jobs/all/", params={"location": "Berlin", "limit": 2, "cursor": cursor}
+    )
+    assert response.status_code == 200
+    assert [job["job_date_posted"] for job in response.json()] == ["2023-01-01"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get(
+        "/jobs/all/", params={"location": "Berlin", "posted_after": "2023-01-02"}
+    )
+    assert len(response.json()) == 2
+
+
+def test_read_jobs_paginated_past_undated_job(client, normal_user_token_headers):
+    """
+    Test that a job created without a posting date is dated today, so the listing
+    pages past it.
+    """
+    data = {
+        "job_title": "SDE undated",
+        "job_company": "doogle",
+        "job_location": "Oslo",
+        "job_description": "python",
+    }
+    for day in (None, "2023-01-01"):
+        data["job_date_posted"] = day
+        client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+
+    response = client.get("/jobs/all/", params={"location": "Oslo", "limit": 1})
+    assert response.status_code == 200
+    assert [job["job_date_posted"] for job in response.json()] == [
+        date.today().isoformat()
+    ]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(
+        "/jobs/all/", params={"location": "Oslo", "limit": 1, "cursor": cursor}
+    )
+    assert [job["job_date_posted"] for job in response.json()] == ["2023-01-01"]
+
+    response = client.get("/jobs/all/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_read_jobs_summary_view(client, normal_user_token_headers, count_statements):
+    """
+    Test that the listing reads only the columns it returns, and that the summary
+    view leaves out the job description.
+    """
+    response = client.get("/jobs/all/", params={"location": "Berlin", "limit": 2})
+    full = response.json()
+    with count_statements() as statements:
+        response = client.get(
+            "/jobs/all/", params={"location": "Berlin", "limit": 2, "view": "summary"}
+        )
+    assert response.status_code == 200
+    assert "job_description" not in statements[0]
+    assert "job_owner_id" not in statements[0]
+    summaries = response.json()
+    assert summaries == [
+        {key: value for key, value in job.items() if key != "job_description"}
+        for job in full
+    ]
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_export_jobs(client, normal_user_token_headers):
+    """
+    Test that the export endpoint streams every active job as NDJSON and as CSV.
+    """
+    response = client.get("/jobs/all/", params={"limit": 500})
+    job_ids = sorted(job["job_id"] for job in response.json())
+
+    response = client.get("/jobs/export/")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [job["job_id"] for job in exported] == job_ids
+    assert exported[0]["job_company"] == "doogle"
+
+    response = client.get("/jobs/export/", params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["job_id"]) for row in rows] == job_ids
+
+    response = client.get("/jobs/export/", params={"format": "xml"})
+    assert response.status_code == 422
+
+
+def test_export_jobs_fetches_in_batches(client, normal_user_token_headers, monkeypatch):
+    """
+    Test that the export reads the cursor in batches of EXPORT_BATCH_SIZE rows
+    rather than buffering the whole result before the first row is sent.
+    """
+    fetches = []
+    fetchmany = AsyncAdapt_aiosqlite_ss_cursor.fetchmany
+
+    def counting_fetchmany(self, size=None):
+        rows = fetchmany(self, size)
+        fetches.append(len(rows))
+        return rows
+
+    def failing_fetchall(self):
+        raise AssertionError("the export buffered the whole result")
+
+    monkeypatch.setattr(AsyncAdapt_aiosqlite_ss_cursor, "fetchmany", counting_fetchmany)
+    monkeypatch.setattr(AsyncAdapt_aiosqlite_ss_cursor, "fetchall", failing_fetchall)
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    response = client.get("/jobs/export/")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) > 2
+    assert max(fetches) <= 2 and len(fetches) > 2
+
+
+def test_search_jobs(client, normal_user_token_headers):
+    """
+    Test that search only returns matching jobs and ranks title matches first.
+    """
+    data = {
+        "job_title": "Backend engineer",
+        "job_company": "doogle",
+        "job_company_url": "www.doogle.com",
+        "job_location": "USA,NY",
+        "job_description": "Operate our kubernetes clusters",
+        "job_date_posted": "2022-03-20",
+    }
+    client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+    data["job_title"] = "Kubernetes engineer"
+    data["job_description"] = "Operate our clusters"
+    client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+
+    response = client.get("/jobs/search/", params={"q": "kubernetes"})
+    assert response.status_code == 200
+    assert [job["job_title"] for job in response.json()] == [
+        "Kubernetes engineer",
+        "Backend engineer",
+    ]
+
+    response = client.get("/jobs/search/", params={"q": 'kubernetes "c++" OR'})
+    assert response.status_code == 200
+    assert response.json() == []
+
+    response = client.get("/jobs/search/", params={"q": ""})
+    assert response.status_code == 422
+
+
+def test_create_jobs_bulk(client, normal_user_token_headers):
+    """
+    Test that bulk creation accepts JSON arrays and NDJSON, creates the valid items
+    and reports the errors of the invalid ones by index.
+    """
+    data = {
+        "job_title": "SDE bulk",
+        "job_company": "doogle",
+        "job_location": "Lisbon",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    response = client.post(
+        "/jobs/bulk/",
+        json=[data, {"job_title": "missing fields"}, data],
+        headers=normal_user_token_headers,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2
+    assert body["failed"] == 1
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][1]["job_id"] is None
+    assert body["results"][1]["errors"]
+    response = client.get(f"/jobs/get/{body['results'][2]['job_id']}/")
+    assert response.json()["job_title"] == "SDE bulk"
+
+    ndjson = "\n".join([json.dumps(data), "{not json", json.dumps(data)]) + "\n"
+    response = client.post(
+        "/jobs/bulk/",
+        content=ndjson,
+        headers={**normal_user_token_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+    assert response.json()["results"][1]["errors"] == [{"msg": "Invalid JSON"}]
+
+    response = client.post(
+        "/jobs/bulk/", json={"not": "a list"}, headers=normal_user_token_headers
+    )
+    assert response.status_code == 400
+
+
+def test_conditional_job_reads(client, normal_user_token_headers):
+    """
+    Test that job reads carry ETag and Last-Modified validators, that a matching
+    conditional request gets an empty 304, and that an update changes the ETag.
+    """
+    data = {
+        "job_title": "SDE cached",
+        "job_company": "doogle",
+        "job_location": "Oslo",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    response = client.post(
+        "/jobs/create/", json=data, headers=normal_user_token_headers
+    )
+    job_id = response.json()["job_id"]
+
+    response = client.get(f"/jobs/get/{job_id}/")
+    etag = response.headers["ETag"]
+    last_modified = response.headers["Last-Modified"]
+    assert etag == f'"{job_id}-1"'
+
+    response = client.get(f"/jobs/get/{job_id}/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    response = client.get(
+        f"/jobs/get/{job_id}/", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    response = client.get("/jobs/all/", params={"location": "Oslo"})
+    list_etag = response.headers["ETag"]
+    response = client.get(
+        "/jobs/all/", params={"location": "Oslo"}, headers={"If-None-Match": list_etag}
+    )
+    assert response.status_code == 304
+
+    data["job_title"] = "SDE changed"
+    client.put(f"/jobs/update/{job_id}/", json=data, headers=normal_user_token_headers)
+    response = client.get(f"/jobs/get/{job_id}/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{job_id}-2"'
+    assert response.json()["job_title"] == "SDE changed"
+    response = client.get(
+        "/jobs/all/", params={"location": "Oslo"}, headers={"If-None-Match": list_etag}
+    )
+    assert response.status_code == 200
+
+    response = client.get("/jobs/get/999999/", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
+
 def test_update_a_job(client, normal_user_token_headers):
     """
     Test the update of a job by making a PUT request to the '/jobs/update/1' endpoint.
@@ -137,3 +414,177 @@ def test_delete_a_job(client, normal_user_token_headers):
 
     response = client.get("/jobs/get/1/")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_update_and_delete_statement_count(
+    client, db_session, normal_user_token_headers, count_statements
+):
+    """
+    Test that updating or deleting an owned job takes a single statement, and that
+    only failed attempts look the job up again to tell not found from forbidden.
+    """
+    data = {
+        "job_title": "SDE counted",
+        "job_company": "doogle",
+        "job_location": "USA,NY",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    response = client.post(
+        "/jobs/create/", json=data, headers=normal_user_token_headers
+    )
+    job_id = response.json()["job_id"]
+    other_user_headers = authentication_token_from_email(
+        client=client, email="otheruser@nofoobar.com", db=db_session
+    )
+    # Authenticated users are cached after their first request.
+    client.delete("/jobs/delete/0/", headers=other_user_headers)
+
+    data["job_title"] = "SDE recounted"
+    with count_statements() as statements:
+        response = client.put(
+            f"/jobs/update/{job_id}/", json=data, headers=normal_user_token_headers
+        )
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE job")
+
+    with count_statements() as statements:
+        response = client.put(
+            f"/jobs/update/{job_id}/", json=data, headers=other_user_headers
+        )
+    assert response.status_code == 401
+    assert len(statements) == 2
+
+    with count_statements() as statements:
+        response = client.delete(f"/jobs/delete/{job_id}/", headers=other_user_headers)
+    assert response.status_code == 401
+    assert len(statements) == 2
+
+    with count_statements() as statements:
+        response = client.delete(
+            f"/jobs/delete/{job_id}/", headers=normal_user_token_headers
+        )
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert statements[0].startswith("DELETE FROM job")
+
+    with count_statements() as statements:
+        response = client.delete(
+            f"/jobs/delete/{job_id}/", headers=normal_user_token_headers
+        )
+    assert response.status_code == 404
+    assert len(statements) == 2
+
+
+def test_job_reads_are_cached(client, normal_user_token_headers, count_statements):
+    """
+    Test that repeated reads of a job are served from the job cache without a query,
+    and that updating or deleting the job invalidates its cached copy.
+    """
+    data = {
+        "job_title": "SDE hot",
+        "job_company": "doogle",
+        "job_location": "Lisbon",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    response = client.post(
+        "/jobs/create/", json=data, headers=normal_user_token_headers
+    )
+    job_id = response.json()["job_id"]
+
+    first = client.get(f"/jobs/get/{job_id}/")
+    with count_statements() as statements:
+        second = client.get(f"/jobs/get/{job_id}/")
+        not_modified = client.get(
+            f"/jobs/get/{job_id}/", headers={"If-None-Match": first.headers["ETag"]}
+        )
+    assert statements == []
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert not_modified.status_code == 304
+
+    data["job_title"] = "SDE hotter"
+    client.put(f"/jobs/update/{job_id}/", json=data, headers=normal_user_token_headers)
+    response = client.get(f"/jobs/get/{job_id}/")
+    assert response.json()["job_title"] == "SDE hotter"
+    assert response.headers["ETag"] == f'"{job_id}-2"'
+
+    client.delete(f"/jobs/delete/{job_id}/", headers=normal_user_token_headers)
+    response = client.get(f"/jobs/get/{job_id}/")
+    assert response.status_code == 404
+
+    stats = client.get("/metrics/cache").json()["jobs"]
+    assert stats["hits"] >= 2
+    assert 0 < stats["hit_ratio"] < 1
+
+
+def test_fast_json_responses(client, normal_user_token_headers, monkeypatch):
+    """
+    Test that the fast serialization path renders job and user listings byte for
+    byte like the response model path.
+    """
+    data = {
+        "job_title": "SDE fast",
+        "job_company": "doogle",
+        "job_location": "Zürich",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+
+    validated = client.get("/jobs/all/", params={"limit": 3})
+    validated_users = client.get("/users/")
+    monkeypatch.setattr(settings, "FAST_JSON_RESPONSES", True)
+    fast = client.get("/jobs/all/", params={"limit": 3})
+    assert fast.content == validated.content
+    assert fast.headers["ETag"] == validated.headers["ETag"]
+    assert fast.headers["X-Next-Cursor"] == validated.headers["X-Next-Cursor"]
+    assert client.get("/users/").content == validated_users.content
+
+
+def test_read_jobs_by_owner(client, db_session, normal_user_token_headers):
+    """
+    Test that GET /jobs/mine/ lists only the jobs of the current user, and that the
+    jobs of any user can be listed by superusers only.
+    """
+    data = {
+        "job_title": "SDE owned",
+        "job_company": "doogle",
+        "job_location": "Madrid",
+        "job_description": "python",
+        "job_date_posted": "2022-03-20",
+    }
+    admin_headers = authentication_token_from_email(
+        client=client, email="admin@nofoobar.com", db=db_session
+    )
+    client.post("/jobs/create/", json=data, headers=admin_headers)
+    data["job_title"] = "SDE mine"
+    data["job_date_posted"] = "2030-01-01"
+    created = client.post("/jobs/create/", json=data, headers=normal_user_token_headers)
+    owner_id = (
+        db_session.query(Job.job_owner_id)
+        .filter(Job.job_id == created.json()["job_id"])
+        .scalar()
+    )
+
+    response = client.get("/jobs/mine/", headers=admin_headers)
+    assert [job["job_title"] for job in response.json()] == ["SDE owned"]
+    response = client.get(
+        "/jobs/mine/", params={"limit": 1}, headers=normal_user_token_headers
+    )
+    assert [job["job_title"] for job in response.json()] == ["SDE mine"]
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get(f"/users/{owner_id}/jobs/", headers=admin_headers)
+    assert response.status_code == 401
+    admin = db_session.query(User).filter(User.email == "admin@nofoobar.com").one()
+    admin.is_superuser = True
+    db_session.commit()
+    response = client.get(
+        f"/users/{owner_id}/jobs/", params={"view": "summary"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    titles = {job["job_title"] for job in response.json()}
+    assert "SDE mine" in titles and "SDE owned" not in titles
@@ -0,0 +1,213 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from jose import jwt
+
+from core.hashing import Hasher, build_password_context, dummy_password_hash
+from core.security import login_limiter, revocation_index
+from db.models.tokens import RevokedToken
+from db.models.users import User
+
+
+def test_login_rehashes_outdated_password_hash(client, db_session):
+    """
+    Test that logging in with a password hashed at a different bcrypt cost than the
+    configured one replaces the stored hash with one at the configured cost.
+    """
+    outdated_hash = build_password_context(["bcrypt"], 5).hash("testing")
+    user = User(
+        username="rehashuser",
+        email="rehashuser@nofoobar.com",
+        hashed_password=outdated_hash,
+        is_active=True,
+        is_superuser=False,
+    )
+    db_session.add(user)
+    db_session.commit()
+
+    data = {"username": "rehashuser@nofoobar.com", "password": "testing"}
+    response = client.post("/login/token", data=data)
+    assert response.status_code == 200
+
+    db_session.refresh(user)
+    assert user.hashed_password != outdated_hash
+    assert user.hashed_password.startswith("$2b$04$")
+
+
+def test_login_with_wrong_password(client):
+    """
+    Test that a wrong password is rejected with 401.
+    """
+    data = {"username": "rehashuser@nofoobar.com", "password": "wrong"}
+    response = client.post("/login/token", data=data)
+    assert response.status_code == 401
+
+
+def test_access_token_claims_skip_user_lookup(client, db_session, count_statements):
+    """
+    Test that the login token carries the user claims, so authenticated requests
+    verify it from the token cache without looking the user up.
+    """
+    user = User(
+        username="claimsuser",
+        email="claimsuser@nofoobar.com",
+        hashed_password=build_password_context(["bcrypt"], 4).hash("testing"),
+        is_active=True,
+        is_superuser=False,
+    )
+    db_session.add(user)
+    db_session.commit()
+    data = {"username": "claimsuser@nofoobar.com", "password": "testing"}
+    token = client.post("/login/token", data=data).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/jobs/mine/", headers=headers)
+    with count_statements() as statements:
+        response = client.get("/jobs/mine/", headers=headers)
+    assert response.status_code == 200
+    assert not [statement for statement in statements if 'FROM "user"' in statement]
+    assert client.get("/metrics/cache").json()["tokens"]["hits"] >= 1
+
+
+def test_refresh_and_logout(client):
+    """
+    Test that a refresh token renews the access token once, is refused as an access
+    token, and that logout revokes both tokens of the session.
+    """
+    data = {"username": "claimsuser@nofoobar.com", "password": "testing"}
+    tokens = client.post("/login/token", data=data).json()
+    refresh_token = tokens["refresh_token"]
+    response = client.get(
+        "/jobs/mine/", headers={"Authorization": f"Bearer {refresh_token}"}
+    )
+    assert response.status_code == 401
+
+    response = client.post("/login/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed["access_token"] != tokens["access_token"]
+    response = client.post("/login/refresh", json={"refresh_token": refresh_token})
+    assert response.status_code == 401
+
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert client.get("/jobs/mine/", headers=headers).status_code == 200
+    response = client.post(
+        "/login/logout",
+        json={"refresh_token": renewed["refresh_token"]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert client.get("/jobs/mine/", headers=headers).status_code == 401
+    response = client.post(
+        "/login/refresh", json={"refresh_token": renewed["refresh_token"]}
+    )
+    assert response.status_code == 401
+
+
+def test_login_rate_limit(client, monkeypatch):
+    """
+    Test that attempts past the username limit are refused with 429 before the
+    credentials are checked, and are counted.
+    """
+    monkeypatch.setitem(login_limiter.limits, "username", (2, 1))
+    data = {"username": "Throttled@nofoobar.com", "password": "wrong"}
+    assert client.post("/login/token", data=data).status_code == 401
+    data["username"] = "throttled@nofoobar.com "
+    assert client.post("/login/token", data=data).status_code == 401
+    response = client.post("/login/token", data=data)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    stats = client.get("/metrics/ratelimit").json()["login"]
+    assert stats["limited_by_username"] == 1
+
+
+def test_login_for_unknown_user(client, db_session, count_statements, monkeypatch):
+    """
+    Test that logins for an unknown email verify a dummy hash, query the database
+    only once while the miss is cached, that registering the email ends the miss,
+    and that registrations do not trust the miss cache.
+    """
+    verified = []
+    verify_password_async = Hasher.verify_password_async
+
+    async def counting_verify(password, hashed_password):
+        verified.append(hashed_password)
+        return await verify_password_async(password, hashed_password)
+
+    monkeypatch.setattr(Hasher, "verify_password_async", counting_verify)
+    data = {"username": "ghost@nofoobar.com", "password": "testing"}
+    assert client.post("/login/token", data=data).status_code == 401
+    with count_statements() as statements:
+        assert client.post("/login/token", data=data).status_code == 401
+    assert not [statement for statement in statements if 'FROM "user"' in statement]
+    assert verified == [dummy_password_hash()] * 2
+
+    user = {"username": "ghost", "email": "ghost@nofoobar.com", "password": "testing"}
+    assert client.post("/users/register", json=user).status_code == 200
+    assert client.post("/login/token", data=data).status_code == 200
+
+    data = {"username": "elsewhere@nofoobar.com", "password": "testing"}
+    assert client.post("/login/token", data=data).status_code == 401
+    # Registered through another worker, whose miss cache is not this one.
+    db_session.add(
+        User(
+            username="elsewhere",
+            email="elsewhere@nofoobar.com",
+            hashed_password=dummy_password_hash(),
+            is_active=True,
+            is_superuser=False,
+        )
+    )
+    db_session.commit()
+    user = {"username": "other", "email": "elsewhere@nofoobar.com", "password": "x"}
+    with count_statements() as statements:
+        assert client.post("/users/register", json=user).status_code == 400
+    assert not [statement for statement in statements if "INSERT" in statement]
+
+
+def test_refresh_token_replay_and_race(client):
+    """
+    Test that a refresh token is refused once used, also by a worker whose
+    revocation index has not synced yet, and that of two concurrent refreshes with
+    one token exactly one succeeds.
+    """
+    data = {"username": "claimsuser@nofoobar.com", "password": "testing"}
+    refresh_token = client.post("/login/token", data=data).json()["refresh_token"]
+    body = {"refresh_token": refresh_token}
+    assert client.post("/login/refresh", json=body).status_code == 200
+    revocation_index.clear()
+    assert client.post("/login/refresh", json=body).status_code == 401
+
+    refresh_token = client.post("/login/token", data=data).json()["refresh_token"]
+    body = {"refresh_token": refresh_token}
+    barrier = threading.Barrier(2)
+
+    def refresh():
+        barrier.wait()
+        return client.post("/login/refresh", json=body).status_code
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        statuses = sorted(executor.map(lambda _: refresh(), range(2)))
+    assert statuses == [200, 401]
+
+
+def test_revocation_committed_out_of_id_order(client, db_session):
+    """
+    Test that a revocation committed after one with a higher id was synced is still
+    loaded by the next sync of the revocation index.
+    """
+    data = {"username": "claimsuser@nofoobar.com", "password": "testing"}
+    token = client.post("/login/token", data=data).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    last_id = max(revocation.id for revocation in db_session.query(RevokedToken))
+    db_session.add(RevokedToken(id=last_id + 2, jti="later", expires_at=expires_at))
+    db_session.commit()
+    revocation_index.synced_at = None
+    assert client.get("/jobs/mine/", headers=headers).status_code == 200
+
+    jti = jwt.get_unverified_claims(token)["jti"]
+    db_session.add(RevokedToken(id=last_id + 1, jti=jti, expires_at=expires_at))
+    db_session.commit()
+    revocation_index.synced_at = None
+    assert client.get("/jobs/mine/", headers=headers).status_code == 401
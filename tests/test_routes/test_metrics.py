@@ -0,0 +1,44 @@
+from core.config import settings
+
+
+def test_read_pool_metrics(client):
+    """
+    Test that the pool metrics endpoint reports occupancy and checkout counters of
+    the pools of both the sync and the asyncio engine, the latter unpooled on
+    SQLite.
+    """
+    response = client.get("/metrics/pool")
+    assert response.status_code == 200
+    pools = response.json()
+    assert pools["sync"]["size"] == settings.DB_POOL_SIZE
+    assert pools["async"]["size"] == 0
+    for stats in pools.values():
+        assert stats["checked_out"] >= 0
+        assert stats["timeouts"] == 0
+        assert "wait_seconds_max" in stats
+
+
+def test_request_timing_metrics(client):
+    """
+    Test that responses report their database time and query count in a
+    Server-Timing header, and that the Prometheus endpoint exposes the request
+    histograms labelled by route template.
+    """
+    response = client.get("/jobs/get/424242/")
+    assert response.status_code == 404
+    timing = response.headers["server-timing"]
+    assert timing.startswith("app;dur=")
+    queries = int(timing.split('desc="')[1].split(" ")[0])
+    assert queries >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",'
+        'route="/jobs/get/{id}/",status="404",le="+Inf"}'
+    ) in body
+    assert 'http_request_db_queries_count{method="GET",route="/jobs/get/{id}/"}' in body
+    assert 'db_pool{name="sync_checked_out"}' in body
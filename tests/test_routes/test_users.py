@@ -1,3 +1,11 @@
+import threading
+
+from sqlalchemy.dialects import postgresql
+
+from core.hashing import Hasher
+from db.operations.users import _list_users_statement
+
+
 def test_create_user(client):
     """
     Test the creation of a user by sending a POST request to the "/users/register" endpoint with the provided data.
@@ -20,3 +28,77 @@ def test_create_user(client):
     assert response.status_code == 200
     assert response.json()["email"] == "testuser@nofoobar.com"
     assert response.json()["is_active"]
+
+
+def test_create_user_when_hashing_pool_is_saturated(client, monkeypatch):
+    """
+    Test that registration is refused with 503 and a Retry-After header, rather than
+    queued, when the password hashing pool has no free slot.
+    """
+    monkeypatch.setattr(Hasher, "_slots", threading.BoundedSemaphore(1))
+    Hasher._slots.acquire()
+    data = {
+        "username": "busyuser",
+        "email": "busyuser@nofoobar.com",
+        "password": "testing",
+    }
+    response = client.post("/users/register", json=data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_read_users_paginated(client):
+    """
+    Test that the user directory is paginated by id, filtered by username or email
+    prefix, and that the first page carries a count estimate.
+    """
+    for name in ("dir-alice", "dir-bob", "dir-carol"):
+        data = {"username": name, "email": f"{name}@nofoobar.com", "password": "x"}
+        client.post("/users/register", json=data)
+
+    response = client.get("/users/", params={"q": "dir-", "limit": 2})
+    assert response.status_code == 200
+    assert [user["username"] for user in response.json()] == ["dir-alice", "dir-bob"]
+    assert "X-Total-Count-Estimate" not in response.headers
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/users/", params={"q": "dir-", "limit": 2, "cursor": cursor})
+    assert [user["username"] for user in response.json()] == ["dir-carol"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/users/", params={"q": "dir-bob@"})
+    assert [user["email"] for user in response.json()] == ["dir-bob@nofoobar.com"]
+
+    response = client.get("/users/", params={"limit": 1})
+    assert len(response.json()) == 1
+    assert int(response.headers["X-Total-Count-Estimate"]) >= 3
+    assert "hashed_password" not in response.json()[0]
+
+    response = client.get("/users/", params={"cursor": "bad"})
+    assert response.status_code == 400
+
+
+def test_user_prefix_match_in_c_collation_on_postgres():
+    """
+    Test that on Postgres the prefix range is compared in the "C" collation, in
+    which it holds and which the prefix indexes use, whatever the database locale.
+    """
+    statement = _list_users_statement(10, None, "dir-", "postgresql")
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.count('COLLATE "C"') == 4
+    statement = _list_users_statement(10, None, "dir-", "sqlite")
+    assert "COLLATE" not in str(statement)
+
+
+def test_create_duplicate_user(client):
+    """
+    Test that registering a taken email or username is refused with 400.
+    """
+    data = {"username": "dupuser", "email": "dupuser@nofoobar.com", "password": "x"}
+    assert client.post("/users/register", json=data).status_code == 200
+    response = client.post("/users/register", json=data)
+    assert response.status_code == 400
+    data["email"] = "otherdupuser@nofoobar.com"
+    response = client.post("/users/register", json=data)
+    assert response.status_code == 400
+    data["username"] = "otherdupuser"
+    assert client.post("/users/register", json=data).status_code == 200